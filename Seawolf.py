@@ -1,6 +1,9 @@
+import operator
 import sys
 import tpg
 
+from SeawolfBudget import BudgetExceeded
+
 class SemanticError(Exception):
     """
     This is the class of the exception that is raised when a semantic error
@@ -17,8 +20,161 @@ class Node(object):
         """
         raise Exception("Not implemented.")
 
-stack = [{}]
+    def resolve(self, scope):
+        """
+        Called on children of Node before evaluation, to bind the variables
+        below that child to frame slots of scope.
+        """
+        pass
+
+    # Whether the node is a statement that can return from the function it
+    # is in. Such statements evaluate to completed when they do not, and to
+    # the returned value when they do; what the others evaluate to is
+    # ignored. resolve() sets it on the compound statements.
+    returns = False
+
+    # The line a statement starts on, set by the parser.
+    line = None
+
+# Frames are lists indexed by the slots resolve() hands out. stack[0] holds
+# the globals, whose slots are in globalSlots; each call pushes a frame
+# sized for its function. Slots nobody has assigned yet hold unbound.
+stack = [[]]
+globalSlots = {}
 functionMap = {}
+unbound = object()
+completed = object()
+
+# Set to a number of calls to turn on tiered execution: a function called
+# that many times is compiled to Python by SeawolfJIT.
+tierThreshold = None
+
+# Set to a number of results to cache per function to memoize the functions
+# SeawolfMemo.analyze() found pure.
+memoSize = None
+
+# Set to a SeawolfBudget.Budget to count the calls against, along with
+# Function.run to Function.countedRun. Each call is counted once, when the
+# function starts: by countedRun for interpreted bodies and by the
+# compiled ones themselves.
+budget = None
+
+# The SeawolfHooks.Hooks of the interpreter that is running, or None. The
+# nodes only call it once activate() has switched them to their hooked
+# versions.
+hooks = None
+
+def globalSlot(name):
+    if name not in globalSlots:
+        globalSlots[name] = len(globalSlots)
+        stack[0].append(unbound)
+    return globalSlots[name]
+
+class Scope(object):
+    """
+    The local slots of one function. Names without one (and everything at
+    the top level, whose scope is empty) live in the globals. function is
+    the name of the function, or None at the top level.
+    """
+
+    def __init__(self, slots, function=None):
+        self.slots = slots
+        self.function = function
+
+    def slot(self, name):
+        return self.slots.get(name)
+
+def resolve(node):
+    """
+    Binds every variable in a parsed program to a slot, marks the calls in
+    tail position and links the calls to their definitions. Must run
+    before the program is evaluated.
+    """
+    node.resolve(Scope({}))
+    link(node)
+
+def link(node):
+    """
+    Binds each call to a function defined exactly once in the program to
+    that definition, checking the number of arguments up front. Calls to
+    anything else keep looking their function up by name.
+    """
+    definitions = {}
+    for n in nodes(node):
+        if isinstance(n, ProcDef):
+            definitions.setdefault(n.left.value, []).append(n)
+    for n in nodes(node):
+        if isinstance(n, ProcedureCall):
+            candidates = definitions.get(n.left.value, [])
+            if len(candidates) == 1:
+                n.function = candidates[0].function
+                if len(n.param) != len(n.function.params):
+                    raise SemanticError()
+            else:
+                n.function = None
+
+def reset():
+    """
+    Forgets all globals and functions, so another program can run.
+    """
+    stack[:] = [[]]
+    globalSlots.clear()
+    functionMap.clear()
+
+def assigned(node, names):
+    """
+    Collects the variables assigned anywhere in a statement, not counting
+    the bodies of functions it defines.
+    """
+    if isinstance(node, Block):
+        for statement in node.statements:
+            assigned(statement, names)
+    elif isinstance(node, Assign):
+        names.append(node.left.value)
+    elif isinstance(node, If):
+        assigned(node.right, names)
+    elif isinstance(node, Else):
+        assigned(node.right1, names)
+        assigned(node.right2, names)
+    return names
+
+def children(node):
+    """
+    Returns the nodes directly below node that get evaluated.
+    """
+    if isinstance(node, Block):
+        return list(node.statements)
+    if isinstance(node, (Assign, Operation, Compare, If)):
+        return [node.left, node.right]
+    if isinstance(node, (Print, Return)):
+        return [node.value]
+    if isinstance(node, Else):
+        return [node.left, node.right1, node.right2]
+    if isinstance(node, ProcDef):
+        return [node.right]
+    if isinstance(node, ProcedureCall):
+        return list(node.param)
+    return []
+
+def nodes(node):
+    """
+    Yields node and everything below it.
+    """
+    yield node
+    for child in children(node):
+        for n in nodes(child):
+            yield n
+
+# Only the operator that was asked for is applied; working all of them out
+# made "x + 0" fail on x % 0.
+operations = {
+    '*': operator.mul,
+    '+': operator.add,
+    '-': operator.sub,
+    '%': operator.mod,
+    '<': operator.lt,
+    '==': operator.eq
+}
 
 class IntLiteral(Node):
 
@@ -34,11 +190,19 @@ class Variable(Node):
         self.value = value
 
     def evaluate(self):
-        if self.value in stack[len(stack) - 1].keys():
-            value = stack[len(stack) - 1][self.value]
-        else:
-            value = stack[0][self.value]
+        if self.slot is not None:
+            value = stack[-1][self.slot]
+            if value is not unbound:
+                return value
+        # Not assigned in this function (yet), so it is a global.
+        value = stack[0][self.globalSlot]
+        if value is unbound:
+            raise KeyError(self.value)
         return value
+
+    def resolve(self, scope):
+        self.slot = scope.slot(self.value)
+        self.globalSlot = globalSlot(self.value)
     
 class Assign(Node):
 
@@ -47,7 +211,16 @@ class Assign(Node):
         self.right = right
 
     def evaluate(self):
-        stack[len(stack) - 1][self.left.value] = self.right.evaluate()
+        if self.left.slot is None:
+            stack[0][self.left.globalSlot] = self.right.evaluate()
+        else:
+            stack[-1][self.left.slot] = self.right.evaluate()
+
+    def resolve(self, scope):
+        if not isinstance(self.left, Variable):
+            raise SemanticError()
+        self.left.resolve(scope)
+        self.right.resolve(scope)
 
 class Print(Node):
 
@@ -57,6 +230,9 @@ class Print(Node):
     def evaluate(self):
         print(self.value.evaluate())
 
+    def resolve(self, scope):
+        self.value.resolve(scope)
+
 class Operation(Node):
 
     def __init__(self, operate, left, right):
@@ -67,12 +243,11 @@ class Operation(Node):
     def evaluate(self):
         left = self.left.evaluate()
         right = self.right.evaluate()
-        return {
-            '*': left * right,
-            '+': left + right,
-            '-': left - right,
-            '%': left % right
-        }[self.operate]
+        return operations[self.operate](left, right)
+
+    def resolve(self, scope):
+        self.left.resolve(scope)
+        self.right.resolve(scope)
 
 class Compare(Node):
 
@@ -84,14 +259,15 @@ class Compare(Node):
     def evaluate(self):
         left = self.left.evaluate()
         right = self.right.evaluate()
-        boolean = {
-            '<':left < right,
-            '==':left == right
-        }[self.operate]
+        boolean = operations[self.operate](left, right)
         if boolean:
             return 1
         else:
             return 0
+
+    def resolve(self, scope):
+        self.left.resolve(scope)
+        self.right.resolve(scope)
     
 # Above: Done
 # Below: Work
@@ -102,22 +278,65 @@ class Block(Node):
         self.statements = []
 
     def evaluate(self):
-        for l in self.statements:
-            result = l.evaluate()
-            if isinstance(l, Block) or isinstance(l, If) or isinstance(l, Else):
-                if result is not None:
+        for plain, exit in self.segments:
+            for l in plain:
+                l.evaluate()
+            if exit is not None:
+                result = exit.evaluate()
+                if result is not completed:
                     return result
-            if isinstance(l, Return):
-                return result
+        return completed
+
+    plainEvaluate = evaluate
+
+    def hookedEvaluate(self):
+        statement = hooks.statement
+        for plain, exit in self.segments:
+            for l in plain:
+                statement(l)
+                l.evaluate()
+            if exit is not None:
+                statement(exit)
+                result = exit.evaluate()
+                if result is not completed:
+                    return result
+        return completed
+
+    def resolve(self, scope):
+        for l in self.statements:
+            l.resolve(scope)
+        # Split the statements into runs that cannot return, each followed
+        # by one that can (or None at the end), so that only those are
+        # checked.
+        self.segments = []
+        plain = []
+        for l in self.statements:
+            if l.returns:
+                self.segments.append((plain, l))
+                plain = []
+            else:
+                plain.append(l)
+        if plain:
+            self.segments.append((plain, None))
+        self.returns = any(l.returns for l in self.statements)
 
 class Return(Node):
 
+    returns = True
+
     def __init__(self, value):
         self.value = value
 
     def evaluate(self):
         return self.value.evaluate()
 
+    def resolve(self, scope):
+        # Inside a function, "return f(...)" hands f back to Function.call
+        # instead of calling it from here.
+        if scope.function is not None and isinstance(self.value, ProcedureCall):
+            self.value.tail = True
+        self.value.resolve(scope)
+
 class If(Node):
 
     def __init__(self, left, right):
@@ -125,11 +344,26 @@ class If(Node):
         self.right = right
 
     def evaluate(self):
-        result = None
         if self.left.evaluate():
+            if self.right.returns:
+                return self.right.evaluate()
             self.right.evaluate()
-        if result is not None:
-            return result
+        return completed
+
+    plainEvaluate = evaluate
+
+    def hookedEvaluate(self):
+        if self.left.evaluate():
+            hooks.statement(self.right)
+            if self.right.returns:
+                return self.right.evaluate()
+            self.right.evaluate()
+        return completed
+
+    def resolve(self, scope):
+        self.left.resolve(scope)
+        self.right.resolve(scope)
+        self.returns = self.right.returns
 
 class Else(Node):
 
@@ -139,13 +373,168 @@ class Else(Node):
         self.right2 = right2
 
     def evaluate(self):
-        result = None
         if self.left.evaluate():
-            result = self.right1.evaluate()
+            branch = self.right1
         else:
-            result = self.right2.evaluate()
-        if result is not None:
-            return result
+            branch = self.right2
+        if branch.returns:
+            return branch.evaluate()
+        branch.evaluate()
+        return completed
+
+    plainEvaluate = evaluate
+
+    def hookedEvaluate(self):
+        if self.left.evaluate():
+            branch = self.right1
+        else:
+            branch = self.right2
+        hooks.statement(branch)
+        if branch.returns:
+            return branch.evaluate()
+        branch.evaluate()
+        return completed
+
+    def resolve(self, scope):
+        self.left.resolve(scope)
+        self.right1.resolve(scope)
+        self.right2.resolve(scope)
+        self.returns = self.right1.returns or self.right2.returns
+
+class TailCall(object):
+    """
+    What a call in tail position evaluates to: the function to call next
+    and its arguments, for Function.call to run in place of the current
+    call.
+    """
+
+    def __init__(self, function, args):
+        self.function = function
+        self.args = args
+
+class Function(object):
+    """
+    A procedure defined by a ProcDef, made when the program is resolved.
+    Counts its calls so that the tiered mode can swap in a compiled version
+    once it gets hot.
+    """
+
+    def __init__(self, name, params, body, size):
+        self.name = name
+        self.params = params
+        self.body = body
+        self.size = size
+        self.blank = [unbound] * size
+        self.defined = False
+        self.calls = 0
+        self.compiled = None
+        self.cache = None
+
+    def warmUp(self):
+        """
+        Counts a call in tiered mode. Returns True once the function has
+        been compiled.
+        """
+        self.calls += 1
+        if self.calls < tierThreshold:
+            return False
+        import SeawolfJIT
+        # Only try once; bodies the compiler cannot handle stay interpreted.
+        self.calls = None
+        self.compiled = SeawolfJIT.compileFunction(self)
+        return self.compiled is not None
+
+    def run(self, args):
+        """
+        Runs the function on args, whose number the caller has checked.
+        """
+        # Tail calls come back here as TailCall results and run in the same
+        # loop, so they need neither a Python frame nor a new stack entry.
+        function = self
+        frame = None
+        while True:
+            if function.compiled is not None:
+                result = function.compiled(*args)
+            elif tierThreshold is not None and function.calls is not None and function.warmUp():
+                continue
+            else:
+                if frame is not None and len(frame) == function.size:
+                    frame[:] = function.blank
+                else:
+                    frame = function.blank[:]
+                # Parameters take the first slots.
+                frame[0:len(args)] = args
+                stack.append(frame)
+                result = function.body.evaluate()
+                stack.pop()
+                if result is completed:
+                    result = None
+            if type(result) is not TailCall:
+                return result
+            function = result.function
+            args = result.args
+
+    plainRun = run
+
+    def countedRun(self, args):
+        """
+        run() counting each interpreted call, tail calls included, against
+        the budget. Compiled functions count their own.
+        """
+        function = self
+        frame = None
+        while True:
+            if function.compiled is not None:
+                result = function.compiled(*args)
+            elif tierThreshold is not None and function.calls is not None and function.warmUp():
+                continue
+            else:
+                budget.tick()
+                if frame is not None and len(frame) == function.size:
+                    frame[:] = function.blank
+                else:
+                    frame = function.blank[:]
+                frame[0:len(args)] = args
+                stack.append(frame)
+                result = function.body.evaluate()
+                stack.pop()
+                if result is completed:
+                    result = None
+            if type(result) is not TailCall:
+                return result
+            function = result.function
+            args = result.args
+
+    def hookedRun(self, args):
+        """
+        run() passing each call, tail calls included, and its result to
+        the hooks, and counting it like countedRun() if there is a budget.
+        Functions are not compiled meanwhile, so that the calls they make
+        are seen too.
+        """
+        function = self
+        while True:
+            hooks.call(function.name, args)
+            if function.compiled is not None:
+                result = function.compiled(*args)
+            else:
+                if budget is not None:
+                    budget.tick()
+                frame = function.blank[:]
+                frame[0:len(args)] = args
+                stack.append(frame)
+                result = function.body.evaluate()
+                stack.pop()
+                if result is completed:
+                    result = None
+            hooks.returned(function.name, result)
+            if type(result) is not TailCall:
+                return result
+            function = result.function
+            args = result.args
+
+    # SeawolfMemo.memoize() replaces this on the function objects it caches.
+    call = run
 
 class ProcDef(Node):
 
@@ -153,28 +542,56 @@ class ProcDef(Node):
         self.left = left
         self.param = param
         self.right = right
+        self.pure = False
 
     def evaluate(self):
-        for i in range(0, len(self.param)):
-            self.param[i] = self.param[i].value
-        functionMap[self.left.value] = [self.param, self.right]
+        function = self.function
+        if memoSize is not None and self.pure and function.cache is None:
+            import SeawolfMemo
+            SeawolfMemo.memoize(function, memoSize)
+        function.defined = True
+        functionMap[self.left.value] = function
+
+    def resolve(self, scope):
+        params = [p.value for p in self.param]
+        if len(set(params)) != len(params):
+            raise SemanticError()
+        slots = {}
+        for name in params + assigned(self.right, []):
+            if name not in slots:
+                slots[name] = len(slots)
+        self.right.resolve(Scope(slots, self.left.value))
+        self.function = Function(self.left.value, params, self.right, len(slots))
 
 class ProcedureCall(Node):
 
     def __init__(self, left, param):
         self.left = left
         self.param = param
+        self.tail = False
+        self.function = None
 
     def evaluate(self):
-        newMap = {}
+        function = self.function
+        if function is None:
+            function = functionMap[self.left.value]
+            if len(self.param) != len(function.params):
+                raise SemanticError()
+        elif not function.defined:
+            raise KeyError(self.left.value)
+        args = []
         for i in range(0, len(self.param)):
-            newMap[functionMap[self.left.value][0][i]] = self.param[i].evaluate()
-        stack.append(newMap)
-        result = functionMap[self.left.value][1].evaluate()
-        stack.pop()
+            args.append(self.param[i].evaluate())
+        if self.tail:
+            return TailCall(function, args)
+        result = function.call(args)
         if result is not None:
             return result
-            
+
+    def resolve(self, scope):
+        for p in self.param:
+            p.resolve(scope)
+
 
 class Parser(tpg.Parser):
     """
@@ -184,7 +601,7 @@ class Parser(tpg.Parser):
  
     START/a -> $ a = Block() $ ( statement/b $ a.statements.append(b) $)* ;
    
-    statement/a -> ( _func_def/a | block/a | code/a );
+    statement/a -> @m ( _func_def/a | block/a | code/a ) $ a.line = self.line(m) $ ;
    
     block/a -> "\{" $ a = Block() $ ( statement/b $ a.statements.append(b) $ )* "\}";
    
@@ -234,21 +651,247 @@ class Parser(tpg.Parser):
 
 parse = Parser()
 
-try:
-    f = open(sys.argv[1], "r")
-except(IndexError, IOError):
-    f = open("input1.txt", "r")
-    
-line = f.read()
-f.close()
+class Interpreter(object):
+    """
+    Runs Seawolf programs with a parser, globals, functions and frames of
+    its own, so that several programs can run in one process without
+    seeing each other's state. The nodes work on the module-level state,
+    which run() points at the interpreter's before it starts.
+
+    The options are those of main(): vm runs programs on SeawolfVM, tiered
+    is the number of calls after which a function is compiled, memo the
+    number of results cached per pure function and optimize the names of
+    the passes to run (an empty list for all of them). budget is the
+    SeawolfBudget.Budget each program gets, or None, profiler a
+    SeawolfProfile.Profiler to run the programs under, sampler a
+    SeawolfSample.Sampler to sample them with and hooks the
+    SeawolfHooks.Hooks to tell what they do, or None. The profile and the
+    samples of each program go to stderr and, if profileFile or
+    sampleFile is set, to that file, where the program is called name.
+    """
 
-try:
-    node = parse(line)
+    def __init__(self, vm=False, tiered=None, memo=None, optimize=None, budget=None,
+                 profiler=None, sampler=None, hooks=None):
+        self.parse = Parser()
+        self.vm = vm
+        self.tiered = tiered
+        self.memo = memo
+        self.optimize = optimize
+        self.budget = budget
+        self.profiler = profiler
+        self.sampler = sampler
+        self.hooks = hooks
+        self.profileFile = None
+        self.sampleFile = None
+        self.name = "<seawolf>"
+        self.stack = [[]]
+        self.globalSlots = {}
+        self.functionMap = {}
+        self.machine = None
+
+    def activate(self):
+        global stack, globalSlots, functionMap, tierThreshold, memoSize, budget, hooks
+        stack = self.stack
+        globalSlots = self.globalSlots
+        functionMap = self.functionMap
+        tierThreshold = self.tiered
+        memoSize = self.memo
+        budget = self.budget
+        hooks = self.hooks
+        if hooks is not None and hooks.wants("call", "return"):
+            Function.run = Function.call = Function.hookedRun
+        elif budget is None:
+            Function.run = Function.call = Function.plainRun
+        else:
+            Function.run = Function.call = Function.countedRun
+        for node in (Block, If, Else):
+            if hooks is not None and hooks.wants("statement"):
+                node.evaluate = node.hookedEvaluate
+            else:
+                node.evaluate = node.plainEvaluate
+
+    def reset(self):
+        """
+        Forgets all globals and functions defined by the programs run so
+        far. Until then, each program sees what the ones before it left.
+        """
+        self.stack[:] = [[]]
+        self.globalSlots.clear()
+        self.functionMap.clear()
+        self.machine = None
 
-    result = node.evaluate()
+    def run(self, source):
+        """
+        Runs a program, printing its output, and SYNTAX ERROR, SEMANTIC
+        ERROR or BUDGET EXCEEDED if it has one. The reports of the
+        optimizer, the caches, the profiler and the sampler, and which
+        budget ran out, go to stderr.
+        """
+        self.activate()
+        if self.profiler is not None:
+            if self.vm:
+                sys.stderr.write("--profile is ignored: only the tree walker can be profiled\n")
+            self.profiler.reset()
+        if self.budget is not None:
+            self.budget.start()
+        sampling = False
+        try:
+            node = self.parse(source)
+            if self.optimize is not None:
+                import SeawolfOpt
+                optimizer = SeawolfOpt.optimizer()
+                for name in optimizer.names():
+                    if self.optimize and name not in self.optimize:
+                        optimizer.disable(name)
+                node = optimizer.run(node)
+                sys.stderr.write(optimizer.report())
+            resolve(node)
+            if self.memo is not None:
+                import SeawolfMemo
+                SeawolfMemo.analyze(node)
+
+            if self.sampler is not None:
+                self.sampler.reset()
+                sampling = self.sampler.start()
+                if not sampling:
+                    sys.stderr.write("--sample is ignored: only the main thread can be sampled\n")
+            try:
+                if self.vm:
+                    import SeawolfVM
+                    if self.machine is None:
+                        self.machine = SeawolfVM.Machine(self.budget)
+                    self.machine.run(SeawolfVM.Compiler().compile(node))
+                elif self.profiler is not None:
+                    self.profiler.instrument(node)
+                    self.profiler.run(node)
+                else:
+                    node.evaluate()
+            finally:
+                if self.sampler is not None:
+                    self.sampler.stop()
+
+            if self.memo is not None:
+                sys.stderr.write(SeawolfMemo.report())
+
+        except tpg.Error as e:
+            self.failed(e)
+            print("SYNTAX ERROR")
+
+        except SemanticError as e:
+            self.failed(e)
+            print("SEMANTIC ERROR")
+
+        except BudgetExceeded as e:
+            self.failed(e)
+            print("BUDGET EXCEEDED")
+            sys.stderr.write("budget exceeded: %s\n" % e)
+
+        except Exception as e:
+            self.failed(e)
+            raise
+
+        finally:
+            # The frames of the calls that were cut short.
+            del self.stack[1:]
+
+        if self.profiler is not None and not self.vm:
+            self.profiled()
+        if sampling:
+            self.sampled()
+
+    def profiled(self):
+        """
+        Writes the report of the profiler to stderr, and the profile asked
+        for to profileFile: the function times for the pstats module if it
+        ends in .prof, the time of each call stack for flame graphs if not.
+        """
+        sys.stderr.write(self.profiler.report())
+        if self.profileFile is None:
+            return
+        if self.profileFile.endswith(".prof"):
+            self.profiler.dump(self.profileFile, self.name)
+        else:
+            f = open(self.profileFile, "w")
+            f.write(self.profiler.collapsed())
+            f.close()
+
+    def sampled(self):
+        """
+        Writes the report of the sampler to stderr, and the samples of each
+        call stack for flame graphs to sampleFile.
+        """
+        sys.stderr.write(self.sampler.report())
+        if self.sampleFile is not None:
+            f = open(self.sampleFile, "w")
+            f.write(self.sampler.collapsed())
+            f.close()
 
-except tpg.Error:
-    print("SYNTAX ERROR")
-        
-except SemanticError:
-    print("SEMANTIC ERROR")
+    def failed(self, error):
+        if self.hooks is not None:
+            self.hooks.error(error)
+
+def configure(options):
+    """
+    Returns an Interpreter set up by the command line options of main().
+    """
+    import SeawolfBudget
+    interpreter = Interpreter(vm="--vm" in options, budget=SeawolfBudget.configure(options))
+    for option in options:
+        if option.startswith("--tiered"):
+            interpreter.tiered = int(option.partition("=")[2] or 100)
+        if option.startswith("--memo"):
+            interpreter.memo = int(option.partition("=")[2] or 1000)
+        if option.startswith("--optimize"):
+            interpreter.optimize = [name for name in option.partition("=")[2].split(",") if name]
+        if option.startswith("--profile"):
+            import SeawolfProfile
+            interpreter.profiler = SeawolfProfile.Profiler()
+            interpreter.profileFile = option.partition("=")[2] or None
+        if option.startswith("--sample"):
+            import SeawolfSample
+            interpreter.sampler = SeawolfSample.Sampler()
+            interpreter.sampleFile = option.partition("=")[2] or None
+    return interpreter
+
+def main(argv):
+    """
+    Runs the program named on the command line (input1.txt by default).
+    Passing --vm runs it on the bytecode machine in SeawolfVM instead of
+    walking the tree, which also lifts the limit on recursion depth.
+    Passing --tiered (or --tiered=N) compiles functions to Python once
+    they have been called 100 (or N) times. Passing --memo (or --memo=N)
+    caches the last 1000 (or N) results of each pure function and reports
+    the cache counters on stderr. Passing --optimize (or, to run only some
+    of the passes in SeawolfOpt, --optimize=inline,fold,dce,strength)
+    optimizes the program before it runs and reports what changed on
+    stderr. Passing --steps=N or --timeout=SECONDS stops the program with
+    BUDGET EXCEEDED after N calls or once it has run for SECONDS. Passing
+    --profile prints the time spent in each function and how often each
+    statement ran on stderr; --profile=FILE also writes the time of each
+    call stack to FILE for flame graphs, or if FILE ends in .prof, the
+    function times for the pstats module. Only the tree walker can be
+    profiled; with --vm, --profile only prints a warning. Passing --sample
+    (or --sample=FILE) does the same by sampling the Seawolf call stack
+    every 5ms of CPU time instead, which costs far less and works in every
+    mode.
+    """
+    options = [a for a in argv[1:] if a.startswith("--")]
+    arguments = [a for a in argv[1:] if not a.startswith("--")]
+
+    try:
+        f = open(arguments[0], "r")
+    except(IndexError, IOError):
+        f = open("input1.txt", "r")
+
+    line = f.read()
+    f.close()
+
+    interpreter = configure(options)
+    interpreter.name = arguments[0] if arguments else "input1.txt"
+    interpreter.run(line)
+
+if __name__ == "__main__":
+    # Make "import Seawolf" from the other modules see this module instead
+    # of loading (and compiling the grammar of) a second copy.
+    sys.modules["Seawolf"] = sys.modules[__name__]
+    main(sys.argv)
@@ -1,16 +1,25 @@
+import array
+import collections
+import copy
+import operator
+from math import frexp
 import sys
 import tpg
 
+from SeawolfPass import Pass, PassManager
+import SeawolfBudget
+from SeawolfBudget import BudgetExceeded
+import SeawolfTrace
+from SeawolfTrace import INFO, DEBUG
+
 class Variables():
     def __init__(self):
         self.variables = {}
         
     def put(self, key, value):
-        print("Putting: ", key, " ", value)
         self.variables[key] = value
         
     def get(self, key):
-        print("Getting: ", key, " ", self.variables[key])
         return self.variables[key]
 
 class SemanticError(Exception):
@@ -34,7 +43,6 @@ class Node(object):
 class IntLiteral(Node):
 
     def __init__(self, value):
-        print("Integer construction: ", value)
         self.value = int(value)
 
     def evaluate(self):
@@ -43,7 +51,6 @@ class IntLiteral(Node):
 class RealLiteral(Node):
 
     def __init__(self, value):
-        print("Real construction: ", value)
         self.value = float(value)
 
     def evaluate(self):
@@ -52,7 +59,6 @@ class RealLiteral(Node):
 class BooleanLiteral(Node):
 
     def __init__(self, value):
-        print("Boolean construction: ", value)
         if value[0] == "t":
             self.value = 1
         elif value[0] == "f":
@@ -68,7 +74,6 @@ class BooleanLiteral(Node):
 class StringLiteral(Node):
 
     def __init__(self, value):
-        print("String construction: ", value)
         temp = str(value)
         self.value = temp[1:len(temp)-1]
 
@@ -78,48 +83,117 @@ class StringLiteral(Node):
 class ListLiteral(Node):
 
     def __init__(self):
-        print("List construction: []")
         self.value = []
 
     def append(self, value):
-        print("List append: ", self.value, value.value)
         self.value.append(value)
 
     def evaluate(self):
-        print("List evaluate: ")
         l = []
         for i in self.value:
             l.append(i.evaluate())
-        return l
+        return pack(l)
+
+class Packed(object):
+    """
+    A list whose elements are all ints that fit in 64 bits, or all floats,
+    which ListLiteral and the element-wise operations make in place of a
+    list. The numbers are kept unboxed in an array.array, in a quarter of
+    the memory of a list of them or less. Writing anything else into it
+    turns the array into a list for good, in place, so that every variable
+    holding it sees the change. Index works on values directly.
+    """
+
+    __slots__ = ("values",)
+
+    def __init__(self, values):
+        self.values = values
+
+    def set(self, index, value):
+        values = self.values
+        if type(values) is not list:
+            if type(value) is (int if values.typecode == "q" else float):
+                try:
+                    values[index] = value
+                    return
+                except OverflowError:
+                    pass
+            values = self.values = list(values)
+        values[index] = value
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, index):
+        if type(index) is slice:
+            return Packed(self.values[index])
+        return self.values[index]
+
+    __setitem__ = set
+
+    def __iter__(self):
+        return iter(self.values)
+
+    def __eq__(self, other):
+        if type(other) is Packed:
+            other = other.values
+        elif type(other) is not list:
+            return NotImplemented
+        return list(self.values) == list(other)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(list(self.values))
+
+sequences = (list, Packed)
+
+def pack(values):
+    """
+    Returns a list of values as a Packed if they are all ints that fit in
+    64 bits or all floats, or else the list itself.
+    """
+    kinds = set(map(type, values))
+    if kinds == {float}:
+        return Packed(array.array("d", values))
+    if kinds == {int}:
+        try:
+            return Packed(array.array("q", values))
+        except OverflowError:
+            pass
+    return values
 
 class VariableLiteral(Node):
 
     def __init__(self, value):
-        print("Variable construction: ", value)
         self.value = value
 
     def evaluate(self):
-        print("Variable evaluation: ", self.value)
         return variables.get(self.value)
 
 class Block(Node):
 
     def __init__(self):
-        print("Block construction: ")
         self.block = []
 
     def evaluate(self):
-        print("Block evaluation: ")
         for l in self.block:
             l.evaluate()
 
+    plainEvaluate = evaluate
+
+    def hookedEvaluate(self):
+        statement = hooks.statement
+        for l in self.block:
+            statement(l)
+            l.evaluate()
+
     def append(self, node):
         self.block.append(node)
 
 class IF(Node):
 
     def __init__(self, condition, block1, block2):
-        print("If construction:")
         self.condition = condition
         self.block1 = block1
         self.block2 = block2
@@ -133,21 +207,44 @@ class IF(Node):
 class WHILE(Node):
 
     def __init__(self, condition, block):
-        print("While construction")
         self.condition = condition
         self.block = block
+        # The Invariant nodes LoopInvariants put in the loop, which are
+        # worked out again each time the loop starts.
+        self.invariants = []
 
     def evaluate(self):
+        for invariant in self.invariants:
+            invariant.cached = unset
+        while self.condition.evaluate():
+            self.block.evaluate()
+
+    plainEvaluate = evaluate
+
+    def countedEvaluate(self):
+        for invariant in self.invariants:
+            invariant.cached = unset
+        tick = budget.tick
         while self.condition.evaluate():
+            tick()
+            self.block.evaluate()
+
+    def hookedEvaluate(self):
+        for invariant in self.invariants:
+            invariant.cached = unset
+        loop = hooks.loop
+        while self.condition.evaluate():
+            if budget is not None:
+                budget.tick()
+            loop(self)
             self.block.evaluate()
 
 class Print(Node):
 
     def __init__(self):
-        print("Print construction: ")
+        self.value = None
 
     def line(self, value):
-        print("Print line: ", type(value))
         self.value = value
         
     def evaluate(self):
@@ -156,7 +253,6 @@ class Print(Node):
 class Assign(Node):
 
     def __init__(self, left, right):
-        print("Assign construction: ", type(left), type(right))
         self.left = left
         self.right = right
 
@@ -170,13 +266,14 @@ class Assign(Node):
 class Index(Node):
 
     def __init__(self, left, right):
-        print("Operation index ", type(left), type(right))
         self.left = left
         self.right = right
 
     def evaluate(self):
         left = self.left.evaluate()
         right = self.right.evaluate()
+        if type(left) is Packed and isinstance(right, int):
+            return left.values[right]
         if not ((isinstance(left, str) or isinstance(left, list)) and isinstance(right, int)):
             raise SemanticError
         return left[right]
@@ -184,6 +281,9 @@ class Index(Node):
     def setValue(self, value):
         left = self.left.evaluate()
         right = self.right.evaluate()
+        if type(left) is Packed and isinstance(right, int):
+            left.set(right, value)
+            return
         if not ((isinstance(left, str) or isinstance(left, list)) and isinstance(right, int)):
             raise SemanticError
         left[right] = value
@@ -191,13 +291,15 @@ class Index(Node):
 class Equal(Node):
 
     def __init__(self, left, right):
-        print("Operation == ", type(left), type(right))
         self.left = left
         self.right = right
 
     def evaluate(self):
         left = self.left.evaluate()
         right = self.right.evaluate()
+        # Two lists are compared as a whole.
+        if vector(left, right):
+            return elementwise("equal", left, right)
         if left == right:
             return 1
         return 0
@@ -205,13 +307,15 @@ class Equal(Node):
 class NotEqual(Node):
 
     def __init__(self, left, right):
-        print("Operation != ", type(left), type(right))
         self.left = left
         self.right = right
 
     def evaluate(self):
         left = self.left.evaluate()
         right = self.right.evaluate()
+        # Two lists are compared as a whole.
+        if vector(left, right):
+            return elementwise("not_equal", left, right)
         if left != right:
             return 1
         return 0
@@ -219,13 +323,14 @@ class NotEqual(Node):
 class Less(Node):
 
     def __init__(self, left, right):
-        print("Operation < ", type(left), type(right))
         self.left = left
         self.right = right
 
     def evaluate(self):
         left = self.left.evaluate()
         right = self.right.evaluate()
+        if type(left) in sequences or type(right) in sequences:
+            return elementwise("less", left, right)
         if left < right:
             return 1
         return 0
@@ -233,13 +338,14 @@ class Less(Node):
 class LessEqual(Node):
 
     def __init__(self, left, right):
-        print("Operation <= ", type(left), type(right))
         self.left = left
         self.right = right
 
     def evaluate(self):
         left = self.left.evaluate()
         right = self.right.evaluate()
+        if type(left) in sequences or type(right) in sequences:
+            return elementwise("less_equal", left, right)
         if left <= right:
             return 1
         return 0
@@ -247,13 +353,14 @@ class LessEqual(Node):
 class Larger(Node):
 
     def __init__(self, left, right):
-        print("Operation > ", type(left), type(right))
         self.left = left
         self.right = right
 
     def evaluate(self):
         left = self.left.evaluate()
         right = self.right.evaluate()
+        if type(left) in sequences or type(right) in sequences:
+            return elementwise("greater", left, right)
         if left > right:
             return 1
         return 0
@@ -261,43 +368,75 @@ class Larger(Node):
 class LargerEqual(Node):
 
     def __init__(self, left, right):
-        print("Operation >= ", type(left), type(right))
         self.left = left
         self.right = right
 
     def evaluate(self):
         left = self.left.evaluate()
         right = self.right.evaluate()
+        if type(left) in sequences or type(right) in sequences:
+            return elementwise("greater_equal", left, right)
         if left >= right:
             return 1
         return 0
 
-class And(Node):
+def vector(left, right):
+    """
+    Whether left and right are a list and a number.
+    """
+    return (type(left) in sequences and type(right) in numbers
+            or type(right) in sequences and type(left) in numbers)
+
+def elementwise(name, left, right):
+    """
+    Applies the operation name to lists element by element (see
+    SeawolfVector.py).
+    """
+    import SeawolfVector
+    return SeawolfVector.apply(name, left, right)
+
+class Arithmetic(Node):
+    """
+    A base class for operators that check the types of their operands in
+    operate(). The first evaluation rewrites the node into the variant of
+    its class for the operand types it saw, if one was registered with
+    specialize(). A variant only guards on those types, and when the guard
+    fails the node goes back to its generic class for good.
+    """
+
+    polymorphic = False
+
+    def evaluate(self):
+        left = self.left.evaluate()
+        right = self.right.evaluate()
+        if not self.polymorphic:
+            kind = type(left)
+            if kind is type(right) and (type(self), kind) in specializations:
+                self.__class__ = specializations[type(self), kind]
+            else:
+                self.polymorphic = True
+        return self.operate(left, right)
+
+class And(Arithmetic):
     
     def __init__(self, left, right):
-        print("Operation and ", type(left), type(right))
         self.left = left
         self.right = right
 
-    def evaluate(self):
-        left = self.left.evaluate()
-        right = self.right.evaluate()
+    def operate(self, left, right):
         if not (isinstance(left, int) and isinstance(right, int)):
             raise SemanticError()
         if left and right:
             return 1
         return 0
 
-class Or(Node):
+class Or(Arithmetic):
 
     def __init__(self, left, right):
-        print("Operation or ", type(left), type(right))
         self.left = left
         self.right = right
 
-    def evaluate(self):
-        left = self.left.evaluate()
-        right = self.right.evaluate()
+    def operate(self, left, right):
         if not (isinstance(left, int) and isinstance(right, int)):
             raise SemanticError()
         if left or right:
@@ -307,7 +446,6 @@ class Or(Node):
 class Not(Node):
 
     def __init__(self, left):
-        print("Operation not ", type(left))
         self.left = left
 
     def evaluate(self):
@@ -318,58 +456,54 @@ class Not(Node):
             return 0
         return 1
 
-class Add(Node):
+class Add(Arithmetic):
 
     def __init__(self, left, right):
-        print("Operation add: ", type(left), " + ", type(right))
         self.left = left
         self.right = right
 
-    def evaluate(self):
-        left = self.left.evaluate()
-        right = self.right.evaluate()
+    def operate(self, left, right):
+        if type(left) in sequences or type(right) in sequences:
+            return elementwise("add", left, right)
         if not ((isinstance(left, int) or isinstance(left, float)) and (isinstance(right, int) or isinstance(right, float))) and not (isinstance(left, str) and isinstance(right, str)):
             raise SemanticError()
         return left + right
 
-class Subtract(Node):
+class Subtract(Arithmetic):
 
     def __init__(self, left, right):
-        print("Operation subtract ", type(left), type(right))
         self.left = left
         self.right = right
 
-    def evaluate(self):
-        left = self.left.evaluate()
-        right = self.right.evaluate()
+    def operate(self, left, right):
+        if type(left) in sequences or type(right) in sequences:
+            return elementwise("subtract", left, right)
         if not (isinstance(left, int) or isinstance(left, float)) and (isinstance(right, int) or isinstance(right, float)):
             raise SemanticError()
         return left - right
 
-class Multiply(Node):
+class Multiply(Arithmetic):
 
     def __init__(self, left, right):
-        print("Operation multiply ", type(left), type(right))
         self.left = left
         self.right = right
 
-    def evaluate(self):
-        left = self.left.evaluate()
-        right = self.right.evaluate()
+    def operate(self, left, right):
+        if type(left) in sequences or type(right) in sequences:
+            return elementwise("multiply", left, right)
         if not (isinstance(left, int) or isinstance(left, float)) and (isinstance(right, int) or isinstance(right, float)):
             raise SemanticError()
         return left * right
 
-class Divide(Node):
+class Divide(Arithmetic):
 
     def __init__(self, left, right):
-        print("Operation divide ", type(left), type(right))
         self.left = left
         self.right = right
 
-    def evaluate(self):
-        left = self.left.evaluate()
-        right = self.right.evaluate()
+    def operate(self, left, right):
+        if type(left) in sequences or type(right) in sequences:
+            return elementwise("true_divide", left, right)
         if not (isinstance(left, int) or isinstance(left, float)):
             raise SemanticError()
         if isinstance(right, int):
@@ -382,16 +516,15 @@ class Divide(Node):
             raise SemanticError()
         return left / right
 
-class FloorDivide(Node):
+class FloorDivide(Arithmetic):
     
     def __init__(self ,left, right):
-        print("Operation floor divide ", type(left), type(right))
         self.left = left
         self.right = right
 
-    def evaluate(self):
-        left = self.left.evaluate()
-        right = self.right.evaluate()
+    def operate(self, left, right):
+        if type(left) in sequences or type(right) in sequences:
+            return elementwise("floor_divide", left, right)
         if not (isinstance(left, int) or isinstance(left, float)):
             raise SemanticError()
         if isinstance(right, int):
@@ -404,16 +537,15 @@ class FloorDivide(Node):
             raise SemanticError()
         return left // right
 
-class Modulo(Node):
+class Modulo(Arithmetic):
 
     def __init__(self ,left, right):
-        print("Operation modulo ", type(left), type(right))
         self.left = left
         self.right = right
 
-    def evaluate(self):
-        left = self.left.evaluate()
-        right = self.right.evaluate()
+    def operate(self, left, right):
+        if type(left) in sequences or type(right) in sequences:
+            return elementwise("remainder", left, right)
         if not (isinstance(left, int) or isinstance(left, float)):
             raise SemanticError()
         if isinstance(right, int):
@@ -426,20 +558,723 @@ class Modulo(Node):
             raise SemanticError()
         return left % right
 
-class Power(Node):
+class Power(Arithmetic):
 
     def __init__(self, left, right):
-        print("Operation power ", type(left), type(right))
         self.left = left
         self.right = right
 
-    def evaluate(self):
-        left = self.left.evaluate()
-        right = self.right.evaluate()
+    def operate(self, left, right):
+        if type(left) in sequences or type(right) in sequences:
+            return elementwise("power", left, right)
         if not (isinstance(left, int) or isinstance(left, float)) and (isinstance(right, int) or isinstance(right, float)):
             raise SemanticError()
         return left ** right
     
+specializations = {}
+proven = {}
+
+def specialize(generic, kind, operate):
+    """
+    Registers the variant of generic for two operands of type kind, which
+    skips the type checks and applies operate directly. It still checks the
+    types of the operands it gets; the variant in proven, which infer()
+    puts where it proved them, does not.
+    """
+    def evaluate(self):
+        left = self.left.evaluate()
+        right = self.right.evaluate()
+        if type(left) is kind and type(right) is kind:
+            try:
+                return operate(left, right)
+            except ZeroDivisionError:
+                # Let the generic node report it.
+                pass
+        self.__class__ = generic
+        self.polymorphic = True
+        return generic.operate(self, left, right)
+    def unchecked(self):
+        left = self.left.evaluate()
+        right = self.right.evaluate()
+        try:
+            return operate(left, right)
+        except ZeroDivisionError:
+            return generic.operate(self, left, right)
+    name = kind.__name__.capitalize() + generic.__name__
+    specializations[generic, kind] = type(name, (generic,), {"evaluate": evaluate})
+    proven[generic, kind] = type("Proven" + name, (generic,), {"evaluate": unchecked})
+
+for kind in (int, float):
+    specialize(Add, kind, operator.add)
+    specialize(Subtract, kind, operator.sub)
+    specialize(Multiply, kind, operator.mul)
+    specialize(Divide, kind, operator.truediv)
+    specialize(FloorDivide, kind, operator.floordiv)
+    specialize(Modulo, kind, operator.mod)
+    specialize(Power, kind, operator.pow)
+specialize(Add, str, operator.add)
+specialize(And, int, lambda left, right: 1 if left and right else 0)
+specialize(Or, int, lambda left, right: 1 if left or right else 0)
+
+numbers = (int, float)
+
+def numeric(left, right):
+    if left is float or right is float:
+        return float
+    return int
+
+def resultType(operation, left, right):
+    """
+    Mirrors the type checks of operation on the types of its operands, None
+    standing for a type that is not known. Returns the type of the result,
+    or None, and raises SemanticError if the checks always fail.
+    """
+    known = left is not None and right is not None
+    if operation in (And, Or):
+        if known and not (left is int and right is int):
+            raise SemanticError()
+        return int
+    if left is list or right is list:
+        # Element by element, with a list or a number on the other side.
+        other = right if left is list else left
+        if other is not None and other is not list and other not in numbers:
+            raise SemanticError()
+        return list
+    if operation is Add:
+        if not known:
+            return None
+        if left in numbers and right in numbers:
+            return numeric(left, right)
+        if left is str and right is str:
+            return str
+        raise SemanticError()
+    if operation in (Subtract, Multiply, Power):
+        if known and left not in numbers and right in numbers:
+            raise SemanticError()
+        # int ** int is a float for negative exponents.
+        if known and operation is not Power and left in numbers and right in numbers:
+            return numeric(left, right)
+        return None
+    # Divide, FloorDivide and Modulo.
+    if (left is not None and left not in numbers) or (right is not None and right not in numbers):
+        raise SemanticError()
+    if not known:
+        return None
+    if operation is Divide:
+        return float
+    return numeric(left, right)
+
+class Inference(object):
+    """
+    Works out the types of the operands of every Arithmetic node of a
+    program without running it. Variables are typed by the assignments that
+    reach them: an if merges the types of its two branches and a while is
+    gone over until the types at its top stop changing. A variable whose
+    type is not known is left out of the types map.
+    """
+
+    def __init__(self):
+        # The operand types of each Arithmetic node, merged over every time
+        # the inference went over it.
+        self.operands = {}
+        # The types of the variables at the top of each while loop, which
+        # hold all the time it runs for the variables it does not assign.
+        self.loops = {}
+
+    def statement(self, node, types):
+        if isinstance(node, Block):
+            for statement in node.block:
+                self.statement(statement, types)
+        elif isinstance(node, Print):
+            self.expression(node.value, types)
+        elif isinstance(node, Assign):
+            kind = self.expression(node.right, types)
+            if not isinstance(node.left, VariableLiteral):
+                self.expression(node.left, types)
+            elif kind is None:
+                types.pop(node.left.value, None)
+            else:
+                types[node.left.value] = kind
+        elif isinstance(node, IF):
+            self.expression(node.condition, types)
+            other = dict(types)
+            self.statement(node.block1, types)
+            self.statement(node.block2, other)
+            merge(types, other)
+        elif isinstance(node, WHILE):
+            while True:
+                body = dict(types)
+                self.expression(node.condition, body)
+                self.statement(node.block, body)
+                before = dict(types)
+                merge(types, body)
+                if types == before:
+                    break
+            self.loops[node] = dict(types)
+        else:
+            self.expression(node, types)
+
+    def expression(self, node, types):
+        """
+        Returns the type node evaluates to, or None if it is not known.
+        """
+        if isinstance(node, (IntLiteral, BooleanLiteral)):
+            return int
+        if isinstance(node, RealLiteral):
+            return float
+        if isinstance(node, StringLiteral):
+            return str
+        if isinstance(node, ListLiteral):
+            for value in node.value:
+                self.expression(value, types)
+            return list
+        if isinstance(node, VariableLiteral):
+            return types.get(node.value)
+        if isinstance(node, (Invariant, Compute)):
+            return self.expression(node.expression, types)
+        if isinstance(node, Reuse):
+            return self.expression(node.source.expression, types)
+        if isinstance(node, Not):
+            self.expression(node.left, types)
+            return int
+        left = self.expression(node.left, types)
+        right = self.expression(node.right, types)
+        if isinstance(node, Index):
+            if left is str and right is int:
+                return str
+            return None
+        if not isinstance(node, Arithmetic):
+            # The comparisons, which give a list on a list and a number, and
+            # on two lists but for == and !=.
+            if left is not list and right is not list:
+                return int
+            if isinstance(node, (Equal, NotEqual)):
+                other = right if left is list else left
+                if other is None:
+                    return None
+                if other not in numbers:
+                    return int
+            return list
+        if node in self.operands:
+            previous = self.operands[node]
+            if previous[0] is not left:
+                left = None
+            if previous[1] is not right:
+                right = None
+        self.operands[node] = (left, right)
+        try:
+            return resultType(type(node), left, right)
+        except SemanticError:
+            return None
+
+def merge(types, other):
+    """
+    Keeps in types the variables that have the same type in other.
+    """
+    for name in list(types):
+        if other.get(name) is not types[name]:
+            del types[name]
+
+def infer(program):
+    """
+    Runs the inference over a parsed program before it is evaluated. The
+    Arithmetic nodes whose operands it proved to have one of the specialized
+    types become the proven variant, which does no type checks. The nodes
+    whose checks can never pass are left to fail when they run; a message
+    for each of them is returned.
+    """
+    inference = Inference()
+    inference.statement(program, {})
+    errors = []
+    for node, (left, right) in inference.operands.items():
+        operation = type(node)
+        try:
+            resultType(operation, left, right)
+        except SemanticError:
+            errors.append("%s of %s and %s always raises a semantic error"
+                          % (operation.__name__, left and left.__name__,
+                             right and right.__name__))
+            continue
+        if left is right and (operation, left) in proven:
+            node.__class__ = proven[operation, left]
+    return errors
+
+operations = (Index, Equal, NotEqual, Less, LessEqual, Larger, LargerEqual,
+              And, Or, Add, Subtract, Multiply, Divide, FloorDivide, Modulo,
+              Power)
+
+fields = {
+    Block: ("block",),
+    IF: ("condition", "block1", "block2"),
+    WHILE: ("condition", "block"),
+    Print: ("value",),
+    Assign: ("left", "right"),
+    ListLiteral: ("value",),
+    Not: ("left",)
+}
+for operation in operations:
+    fields[operation] = ("left", "right")
+
+literals = (IntLiteral, RealLiteral, BooleanLiteral, StringLiteral)
+
+def literal(value):
+    if type(value) is int:
+        return IntLiteral(value)
+    if type(value) is float:
+        return RealLiteral(value)
+    return StringLiteral('"%s"' % value)
+
+# Operations whose result would be bigger than this, in bits for an int
+# and in characters for a string, are left to run: working out
+# 9 ** 9 ** 9 or 300000000 * "ab" would hang the optimizer or fill its
+# memory, even if it sits in a branch that never runs.
+foldSize = 4096
+
+def size(value):
+    if type(value) is int:
+        return value.bit_length()
+    if type(value) is str:
+        return len(value)
+    # Floats, whose size is fixed.
+    return 0
+
+def huge(node):
+    """
+    Whether node, an operation on literals, may give a result too big to
+    fold. Worked out from the operands, without computing the result.
+    """
+    if not isinstance(node, (Add, Multiply, Power)):
+        return False
+    left = node.left.value
+    right = node.right.value
+    if isinstance(node, Power):
+        return (type(left) is int and type(right) is int and right > 0
+                and abs(left) > 1 and (abs(left).bit_length() - 1) * right > foldSize)
+    if isinstance(node, Multiply) and str in (type(left), type(right)):
+        # Repeating a string.
+        count, text = (right, left) if type(left) is str else (left, right)
+        return type(count) is int and count * len(text) > foldSize
+    return size(left) + size(right) > foldSize
+
+class ConstantFolding(Pass):
+
+    name = "fold"
+    fields = fields
+
+    def visit(self, node):
+        if isinstance(node, Not):
+            operands = [node.left]
+        elif isinstance(node, operations):
+            operands = [node.left, node.right]
+        else:
+            return node
+        if all(isinstance(n, literals) for n in operands) and not huge(node):
+            try:
+                # On a copy, which the first evaluation may specialize.
+                value = copy.copy(node).evaluate()
+            except (SemanticError, ArithmeticError, TypeError, IndexError):
+                # Left to fail when it runs.
+                return node
+            if type(value) in (int, float, str):
+                self.stats["operations"] += 1
+                return literal(value)
+        return node
+
+class DeadCode(Pass):
+
+    name = "dce"
+    fields = fields
+
+    def visit(self, node):
+        if isinstance(node, IF) and isinstance(node.condition, literals):
+            self.stats["branches"] += 1
+            if node.condition.value:
+                return node.block1
+            return node.block2
+        if isinstance(node, WHILE) and isinstance(node.condition, literals) and not node.condition.value:
+            self.stats["loops"] += 1
+            return Block()
+        return node
+
+def inverse(value):
+    """
+    Returns 1 / value if value is a power of two, which makes it exact, or
+    None.
+    """
+    try:
+        mantissa, exponent = frexp(value)
+    except OverflowError:
+        return None
+    if mantissa != 0.5 or not -1000 < exponent < 1000:
+        return None
+    return 1.0 / value
+
+class StrengthReduction(Pass):
+    """
+    Uses the operand types Inference finds: x ** 1 becomes x when x is a
+    number, x / 2.0 becomes x * 0.5 when x is a float, and x ** 2 becomes
+    x * x and x + 0, x - 0 and x * 1 become x when x is an int. A float
+    x * x gives inf where x ** 2 raises OverflowError, so it is left.
+    """
+
+    name = "strength"
+    fields = fields
+
+    def run(self, node):
+        self.inference = Inference()
+        self.inference.statement(node, {})
+        return self.rewrite(node)
+
+    def visit(self, node):
+        if node not in self.inference.operands:
+            return node
+        left, right = self.inference.operands[node]
+        operation = type(node)
+        if not isinstance(node.right, (IntLiteral, RealLiteral)) or right is None:
+            return node
+        value = node.right.value
+        if operation is Power and left in numbers and right is int:
+            if value == 1:
+                self.stats["powers"] += 1
+                return node.left
+            if value == 2 and left is int and isinstance(node.left, (VariableLiteral,) + literals):
+                self.stats["powers"] += 1
+                return Multiply(node.left, node.left)
+        if operation is Divide and left is float and inverse(value) is not None:
+            # Dividing by a power of two and multiplying by its inverse give
+            # the same float.
+            self.stats["divisions"] += 1
+            return Multiply(node.left, RealLiteral(inverse(value)))
+        if left is int and right is int and (operation, value) in ((Add, 0), (Subtract, 0), (Multiply, 1)):
+            self.stats["identities"] += 1
+            return node.left
+        return node
+
+unset = object()
+
+class Compute(Node):
+    """
+    The first evaluation of an expression that comes up more than once in
+    a statement. It keeps the value for the Reuse nodes standing for the
+    later ones.
+    """
+
+    def __init__(self, expression):
+        self.expression = expression
+        self.cached = unset
+
+    def evaluate(self):
+        self.cached = self.expression.evaluate()
+        return self.cached
+
+class Reuse(Node):
+
+    def __init__(self, source):
+        self.source = source
+
+    def evaluate(self):
+        value = self.source.cached
+        # A list an operation made may be changed through the variable it
+        # ends up in, so each gets a copy.
+        if type(value) in sequences:
+            return value[:]
+        return value
+
+class Invariant(Node):
+    """
+    An expression whose value does not change while a loop runs. It is
+    evaluated where it stands the first time it is reached after the loop
+    starts, and later evaluations return that value, so it fails at the
+    same point as before and not at all if it is never reached.
+    """
+
+    def __init__(self, expression, loop):
+        self.expression = expression
+        self.loop = loop
+        self.cached = unset
+
+    def evaluate(self):
+        if self.cached is unset:
+            self.cached = self.expression.evaluate()
+        # As for Reuse, the list that is kept must not change.
+        if type(self.cached) in sequences:
+            return self.cached[:]
+        return self.cached
+
+fields[Compute] = ("expression",)
+fields[Invariant] = ("expression",)
+
+def candidate(node):
+    """
+    Whether node is an expression worth computing only once.
+    """
+    return isinstance(node, operations + (Not, Compute))
+
+def key(node, keys):
+    """
+    Returns a key that is the same for two expressions only if they are
+    written the same. keys caches the keys found so far by node id.
+    """
+    if id(node) in keys:
+        return keys[id(node)]
+    if isinstance(node, literals + (VariableLiteral,)):
+        result = (type(node), repr(node.value))
+    elif isinstance(node, Not):
+        result = (Not, key(node.left, keys))
+    elif isinstance(node, operations):
+        result = (type(node), key(node.left, keys), key(node.right, keys))
+    else:
+        # A new list each time, or already shared.
+        result = (type(node), id(node))
+    keys[id(node)] = result
+    return result
+
+def operands(node):
+    """
+    Returns the expressions directly below node, in the order they are
+    evaluated.
+    """
+    if isinstance(node, Not):
+        return [node.left]
+    if isinstance(node, operations):
+        return [node.left, node.right]
+    if isinstance(node, ListLiteral):
+        return node.value
+    return []
+
+def roots(statement):
+    """
+    Returns the holders and attribute names of the expressions statement
+    evaluates itself, in the order it evaluates them.
+    """
+    if isinstance(statement, Print):
+        return [(statement, "value")]
+    if isinstance(statement, Assign):
+        if isinstance(statement.left, VariableLiteral):
+            return [(statement, "right")]
+        # Index.setValue evaluates the list and the index after the value.
+        return [(statement, "right"), (statement.left, "left"), (statement.left, "right")]
+    if isinstance(statement, (IF, WHILE)):
+        return [(statement, "condition")]
+    return []
+
+class CommonSubexpressions(Pass):
+    """
+    Computes an expression that comes up more than once in a statement
+    once. Expressions have no side effects and every part of one is
+    evaluated every time, so the first copy evaluated can keep its value
+    for the others. New lists are never shared, and neither is the list an
+    element is assigned into, which must not be the copy Reuse returns.
+    """
+
+    name = "cse"
+    fields = fields
+
+    def visit(self, node):
+        holders = roots(node)
+        if not holders:
+            return node
+        target = None
+        if isinstance(node, Assign) and isinstance(node.left, Index):
+            target = node.left.left
+        keys = {}
+        counts = collections.Counter()
+        todo = [getattr(holder, name) for holder, name in holders]
+        while todo:
+            expression = todo.pop()
+            if expression is not target:
+                counts[key(expression, keys)] += 1
+            todo.extend(operands(expression))
+        computed = {}
+        for holder, name in holders:
+            expression = getattr(holder, name)
+            if expression is target:
+                self.inside(expression, keys, counts, computed)
+            else:
+                setattr(holder, name, self.share(expression, keys, counts, computed))
+        return node
+
+    def share(self, node, keys, counts, computed):
+        if isinstance(node, (Not,) + operations) and counts[key(node, keys)] > 1:
+            # The copies inside are left for the next round, when they are
+            # only counted once.
+            k = key(node, keys)
+            if k in computed:
+                self.stats["reused"] += 1
+                return Reuse(computed[k])
+            computed[k] = Compute(node)
+            return computed[k]
+        return self.inside(node, keys, counts, computed)
+
+    def inside(self, node, keys, counts, computed):
+        """
+        Shares the expressions below node.
+        """
+        if isinstance(node, Not):
+            node.left = self.share(node.left, keys, counts, computed)
+        elif isinstance(node, operations):
+            node.left = self.share(node.left, keys, counts, computed)
+            node.right = self.share(node.right, keys, counts, computed)
+        elif isinstance(node, ListLiteral):
+            node.value[:] = [self.share(v, keys, counts, computed) for v in node.value]
+        return node
+
+def changed(node, names):
+    """
+    Collects in names the variables a statement assigns. Returns whether it
+    changes an element of a list through Index.setValue.
+    """
+    if isinstance(node, Block):
+        return any([changed(statement, names) for statement in node.block])
+    if isinstance(node, IF):
+        return any([changed(node.block1, names), changed(node.block2, names)])
+    if isinstance(node, WHILE):
+        return changed(node.block, names)
+    if isinstance(node, Assign):
+        if isinstance(node.left, VariableLiteral):
+            names.add(node.left.value)
+            return False
+        return True
+    return False
+
+class LoopInvariants(Pass):
+    """
+    Computes the expressions in a while loop that read no variable the
+    loop assigns once per run of the loop, in Invariant nodes. If the loop
+    changes any list element, expressions reading a variable Inference does
+    not prove to hold a number or a string are left alone too, since the
+    variable may hold a list that changes, through it or another variable.
+    Identical expressions in a loop share one Invariant node.
+    """
+
+    name = "licm"
+    fields = fields
+
+    def run(self, node):
+        self.inference = Inference()
+        self.inference.statement(node, {})
+        return self.rewrite(node)
+
+    def visit(self, node):
+        if not isinstance(node, WHILE):
+            return node
+        self.loop = node
+        self.names = set()
+        self.writes = changed(node, self.names)
+        self.types = self.inference.loops.get(node, {})
+        self.keys = {}
+        self.hoisted = {}
+        # The loops inside, whose Invariant nodes may move out to this one.
+        self.inner = set()
+        self.statement(node)
+        return node
+
+    def invariant(self, node):
+        if isinstance(node, VariableLiteral):
+            if node.value in self.names:
+                return False
+            return not self.writes or self.types.get(node.value) in (int, float, str)
+        if isinstance(node, literals):
+            return True
+        if isinstance(node, (Invariant, Compute)):
+            return self.invariant(node.expression)
+        if isinstance(node, Reuse):
+            return self.invariant(node.source.expression)
+        if isinstance(node, (Not,) + operations):
+            return all(self.invariant(n) for n in operands(node))
+        # Lists are made anew each time.
+        return False
+
+    def statement(self, node):
+        if isinstance(node, Block):
+            for statement in node.block:
+                self.statement(statement)
+        elif isinstance(node, IF):
+            self.statement(node.block1)
+            self.statement(node.block2)
+        elif isinstance(node, WHILE):
+            self.inner.add(node)
+            self.statement(node.block)
+        for holder, name in roots(node):
+            setattr(holder, name, self.expression(getattr(holder, name)))
+
+    def expression(self, node):
+        if isinstance(node, Invariant):
+            if node.loop is self.loop or node.loop not in self.inner:
+                return node
+            if self.invariant(node):
+                # Moved out of an inner loop.
+                node.loop.invariants.remove(node)
+                node.loop = self.loop
+                self.loop.invariants.append(node)
+                self.stats["moved out"] += 1
+            else:
+                # Parts of it may still be invariant here.
+                node.expression = self.expression(node.expression)
+            return node
+        if candidate(node) and self.invariant(node):
+            k = key(node, self.keys)
+            if k not in self.hoisted:
+                self.hoisted[k] = Invariant(node, self.loop)
+                self.loop.invariants.append(self.hoisted[k])
+            self.stats["expressions"] += 1
+            return self.hoisted[k]
+        if isinstance(node, Compute):
+            node.expression = self.expression(node.expression)
+        elif isinstance(node, Not):
+            node.left = self.expression(node.left)
+        elif isinstance(node, operations):
+            node.left = self.expression(node.left)
+            node.right = self.expression(node.right)
+        elif isinstance(node, ListLiteral):
+            node.value[:] = [self.expression(v) for v in node.value]
+        return node
+
+def optimizer():
+    """
+    Returns a PassManager running all the passes above.
+    """
+    return PassManager([StrengthReduction(), ConstantFolding(), DeadCode(),
+                        CommonSubexpressions(), LoopInvariants()])
+
+# The trace points, by category: what the parser builds, what is evaluated
+# and what the variable map is asked for. Statements are traced at INFO,
+# everything else at DEBUG.
+def constructed(message):
+    return lambda node, *args: (message,) + tuple(type(a) for a in args)
+
+SeawolfTrace.point("parse", DEBUG, IntLiteral, "__init__", lambda node, value: ("Integer construction: ", value))
+SeawolfTrace.point("parse", DEBUG, RealLiteral, "__init__", lambda node, value: ("Real construction: ", value))
+SeawolfTrace.point("parse", DEBUG, BooleanLiteral, "__init__", lambda node, value: ("Boolean construction: ", value))
+SeawolfTrace.point("parse", DEBUG, StringLiteral, "__init__", lambda node, value: ("String construction: ", value))
+SeawolfTrace.point("parse", DEBUG, VariableLiteral, "__init__", lambda node, value: ("Variable construction: ", value))
+SeawolfTrace.point("parse", DEBUG, ListLiteral, "__init__", lambda node: ("List construction: []",))
+SeawolfTrace.point("parse", DEBUG, ListLiteral, "append", lambda node, value: ("List append: ", node.value, value.value))
+SeawolfTrace.point("parse", INFO, Block, "__init__", lambda node: ("Block construction: ",))
+SeawolfTrace.point("parse", INFO, IF, "__init__", lambda node, *args: ("If construction:",))
+SeawolfTrace.point("parse", INFO, WHILE, "__init__", lambda node, *args: ("While construction",))
+SeawolfTrace.point("parse", INFO, Print, "__init__", lambda node: ("Print construction: ",))
+SeawolfTrace.point("parse", INFO, Print, "line", lambda node, value: ("Print line: ", type(value)))
+SeawolfTrace.point("parse", INFO, Assign, "__init__", constructed("Assign construction: "))
+SeawolfTrace.point("parse", DEBUG, Compute, "__init__", lambda node, expression: ("Compute construction: ", type(expression)))
+SeawolfTrace.point("parse", DEBUG, Reuse, "__init__", lambda node, source: ("Reuse construction: ", type(source.expression)))
+SeawolfTrace.point("parse", DEBUG, Invariant, "__init__", lambda node, expression, loop: ("Invariant construction: ", type(expression)))
+for operation, message in ((Index, "Operation index "), (Equal, "Operation == "),
+                           (NotEqual, "Operation != "), (Less, "Operation < "),
+                           (LessEqual, "Operation <= "), (Larger, "Operation > "),
+                           (LargerEqual, "Operation >= "), (And, "Operation and "),
+                           (Or, "Operation or "), (Not, "Operation not "),
+                           (Subtract, "Operation subtract "), (Multiply, "Operation multiply "),
+                           (Divide, "Operation divide "), (FloorDivide, "Operation floor divide "),
+                           (Modulo, "Operation modulo "), (Power, "Operation power ")):
+    SeawolfTrace.point("parse", DEBUG, operation, "__init__", constructed(message))
+SeawolfTrace.point("parse", DEBUG, Add, "__init__", lambda node, left, right: ("Operation add: ", type(left), " + ", type(right)))
+SeawolfTrace.point("eval", INFO, Block, "evaluate", lambda node: ("Block evaluation: ",))
+SeawolfTrace.point("eval", DEBUG, ListLiteral, "evaluate", lambda node: ("List evaluate: ",))
+SeawolfTrace.point("eval", DEBUG, VariableLiteral, "evaluate", lambda node: ("Variable evaluation: ", node.value))
+SeawolfTrace.point("variables", INFO, Variables, "put", lambda variables, key, value: ("Putting: ", key, " ", value))
+SeawolfTrace.point("variables", DEBUG, Variables, "get", lambda variables, key: ("Getting: ", key, " ", variables.variables[key]))
+
 # This is the TPG Parser that is responsible for turning our language into
 # an abstract syntax tree.
 class Parser(tpg.Parser):
@@ -487,12 +1322,12 @@ class Parser(tpg.Parser):
     Addsub/a -> Muldiv/a("\+" Muldiv/b $ a = Add(a, b)$
     | "-" Muldiv/b $ a = Subtract(a, b)$)*;
     
-    Muldiv/a -> Pow/a("\*" Pow/b $ a = Multiply(a, b)$
+    Muldiv/a -> Pow/a("\*(?!\*)" Pow/b $ a = Multiply(a, b)$
     | "/" Pow/b $ a = Divide(a, b) $
     | "//" Pow/b $ a = FloorDivide(a, b)$
     | "%" Pow/b $ a = Modulo(a, b)$)*;
 
-    Pow/a -> Index/a ("\*\*" NumberFact/b $ a = Power(a, b)$)*;
+    Pow/a -> Index/a ("\*\*" Pow/b $ a = Power(a, b)$)*;
     
     Index/a -> Fact/a ("\\[" Number/b "\\]" $ a = Index(a, b)$)*;
     
@@ -514,40 +1349,175 @@ class Parser(tpg.Parser):
 
 # Make an instance of the parser. This acts like a function.
 parse = Parser()
-# This is the driver code, that reads in lines, deals with errors, and
-# prints the output if no error occurs.
 
-# Open the file containing the input.
-try:
-    f = open(sys.argv[1], "r")
-except(IndexError, IOError):
-    f = open("input1.txt", "r")
+# The variable map of the program that is running, the
+# SeawolfBudget.Budget its loops are counted against, if WHILE.evaluate is
+# WHILE.countedEvaluate or WHILE.hookedEvaluate, and the SeawolfHooks.Hooks
+# told what it does, if the nodes have been switched to their hooked
+# versions.
+variables = Variables()
+budget = None
+hooks = None
 
-# Read the whole program into one line string.
-line = f.read()
-f.close()
+class Interpreter(object):
+    """
+    Runs programs with a parser and variables of its own, so that several
+    programs can run in one process without seeing each other's variables.
+    The nodes work on the module-level variables, which run() points at
+    the interpreter's before it starts. optimize holds the names of the
+    passes of optimizer() to run (an empty list for all of them), infer
+    runs infer() on each program first, budget is the SeawolfBudget.Budget
+    each program gets, hooks the SeawolfHooks.Hooks to tell what they do,
+    or None, and trace the categories and level SeawolfTrace traces them
+    at, or None.
+    """
 
-# Try to initialize varible map
-variables = Variables()
-try:
-    # Try to parse the expression.
-    node = parse(line)
-
-    # Try to get a result.
-    result = node.evaluate()
-
-    # Print the representation of the result.
-    #print(repr(result))
-
-# If an exception is thrown, print the appropriate error.
-except tpg.Error:
-    print("SYNTAX ERROR")
-    # Uncomment the next line to re-raise the syntax error,
-    # displaying where it occurs. Comment it for submission.
-    # raise
-        
-except SemanticError:
-    print("SEMANTIC ERROR")
-    # Uncomment the next line to re-raise the semantic error,
-    # displaying where it occurs. Comment it for submission.
-    # raise
+    def __init__(self, optimize=None, infer=False, budget=None, hooks=None, trace=None):
+        self.parse = Parser()
+        self.optimize = optimize
+        self.infer = infer
+        self.budget = budget
+        self.hooks = hooks
+        self.trace = trace
+        self.variables = Variables()
+
+    def reset(self):
+        """
+        Forgets the variables the programs run so far assigned. Until then,
+        each program sees what the ones before it left.
+        """
+        self.variables = Variables()
+
+    def run(self, source):
+        """
+        Runs a program, printing its output, and SYNTAX ERROR, SEMANTIC
+        ERROR or BUDGET EXCEEDED if it has one. The reports of the
+        optimizer, the type errors infer() finds, which budget ran out and
+        the trace go to stderr.
+        """
+        global variables, budget, hooks
+        variables = self.variables
+        budget = self.budget
+        hooks = self.hooks
+        if hooks is not None and hooks.wants("loop"):
+            WHILE.evaluate = WHILE.hookedEvaluate
+        elif budget is None:
+            WHILE.evaluate = WHILE.plainEvaluate
+        else:
+            WHILE.evaluate = WHILE.countedEvaluate
+        # Block.evaluate has a trace point, which must stay on whichever
+        # version runs.
+        if hooks is not None and hooks.wants("statement"):
+            SeawolfTrace.swap(Block, "evaluate", Block.hookedEvaluate)
+        else:
+            SeawolfTrace.swap(Block, "evaluate", Block.plainEvaluate)
+        if self.trace is not None:
+            SeawolfTrace.enable(*self.trace)
+        if budget is not None:
+            budget.start()
+        try:
+            # Try to parse the expression.
+            node = self.parse(source)
+
+            if self.optimize is not None:
+                manager = optimizer()
+                for name in manager.names():
+                    if self.optimize and name not in self.optimize:
+                        manager.disable(name)
+                node = manager.run(node)
+                sys.stderr.write(manager.report())
+
+            if self.infer:
+                for error in infer(node):
+                    sys.stderr.write("type error: %s\n" % error)
+
+            # Try to get a result.
+            result = node.evaluate()
+
+            # Print the representation of the result.
+            #print(repr(result))
+
+        # If an exception is thrown, print the appropriate error.
+        except tpg.Error as e:
+            self.failed(e)
+            print("SYNTAX ERROR")
+            # Uncomment the next line to re-raise the syntax error,
+            # displaying where it occurs. Comment it for submission.
+            # raise
+
+        except SemanticError as e:
+            self.failed(e)
+            print("SEMANTIC ERROR")
+            # Uncomment the next line to re-raise the semantic error,
+            # displaying where it occurs. Comment it for submission.
+            # raise
+
+        except BudgetExceeded as e:
+            self.failed(e)
+            print("BUDGET EXCEEDED")
+            sys.stderr.write("budget exceeded: %s\n" % e)
+
+        except Exception as e:
+            self.failed(e)
+            raise
+
+        finally:
+            if self.trace is not None:
+                SeawolfTrace.disable()
+
+    def failed(self, error):
+        if self.hooks is not None:
+            self.hooks.error(error)
+
+def configure(options):
+    """
+    Returns an Interpreter set up by the command line options of main().
+    """
+    interpreter = Interpreter(infer="--infer" in options, budget=SeawolfBudget.configure(options))
+    level = DEBUG
+    for option in options:
+        if option.startswith("--trace-level="):
+            level = SeawolfTrace.levels[option.partition("=")[2]]
+    for option in options:
+        if option.startswith("--optimize"):
+            interpreter.optimize = [name for name in option.partition("=")[2].split(",") if name]
+        if option == "--trace" or option.startswith("--trace="):
+            names = [name for name in option.partition("=")[2].split(",") if name]
+            interpreter.trace = (names or SeawolfTrace.categories, level)
+    return interpreter
+
+# This is the driver code, that reads in lines, deals with errors, and
+# prints the output if no error occurs.
+def main(argv):
+    """
+    Runs the program named on the command line (input1.txt by default).
+
+    Options start with "--"; "--infer" runs infer() on the program first,
+    and "--optimize" (or "--optimize=fold,dce,strength,cse,licm" for only
+    some of them) runs the passes of optimizer() and reports what they
+    changed. "--trace" (or "--trace=parse,eval,variables" for only some
+    categories) traces the interpreter on stderr, everything or with
+    "--trace-level=info" only the statements. "--steps=N" and
+    "--timeout=SECONDS" stop the program with BUDGET EXCEEDED after N loop
+    iterations or once it has run for SECONDS.
+    """
+    options = [a for a in argv[1:] if a.startswith("--")]
+    arguments = [a for a in argv[1:] if not a.startswith("--")]
+
+    # Open the file containing the input.
+    try:
+        f = open(arguments[0], "r")
+    except(IndexError, IOError):
+        f = open("input1.txt", "r")
+
+    # Read the whole program into one line string.
+    line = f.read()
+    f.close()
+
+    configure(options).run(line)
+
+if __name__ == "__main__":
+    # Make "import SeawolfBase" from the other modules see this module
+    # instead of loading (and compiling the grammar of) a second copy.
+    sys.modules["SeawolfBase"] = sys.modules[__name__]
+    main(sys.argv)
@@ -0,0 +1,150 @@
+"""
+Runs many Seawolf programs, or many hw5.py expression lines, on a pool of
+worker processes.
+
+Each worker builds its interpreter once, when it starts, and runs the
+items it is handed with it, resetting it between programs. The items go
+out in chunks and their output comes back in the order they were given,
+whatever order the workers finish them in.
+
+Run "python SeawolfBatch.py [options] PATH..." where each PATH is a
+directory (whose *.txt files are run), a glob pattern or a program, or
+"python SeawolfBatch.py --lines [options] FILE..." to evaluate every line
+of the files with hw5.py. The options of Seawolf.py are passed on to the
+interpreters, or with --base those of SeawolfBase.py. --workers=N sets the
+number of processes (one per core by default), --chunk=N the number of
+items handed to a worker at a time, and --report prints how long each
+item took on stderr.
+"""
+import concurrent.futures
+import contextlib
+import glob
+import io
+import os
+import sys
+import time
+import traceback
+
+# The interpreter of the worker process, made by start(), and whether its
+# items are hw5.py lines rather than programs.
+interpreter = None
+lineMode = False
+
+def start(options):
+    """
+    Sets up a worker process for the items described by options.
+    """
+    global interpreter, lineMode
+    if "--lines" in options:
+        import hw5
+        interpreter = hw5
+        lineMode = True
+    elif "--base" in options:
+        import SeawolfBase
+        interpreter = SeawolfBase.configure(options)
+    else:
+        import Seawolf
+        interpreter = Seawolf.configure(options)
+
+def run(item):
+    """
+    Runs a program (a path) or a line in the worker. Returns what it
+    printed, the traceback of what it died of or None, and the seconds it
+    took.
+    """
+    output = io.StringIO()
+    error = None
+    begin = time.perf_counter()
+    with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+        try:
+            if lineMode:
+                interpreter.run(item)
+            else:
+                f = open(item, "r")
+                source = f.read()
+                f.close()
+                interpreter.reset()
+                interpreter.run(source)
+        except Exception:
+            error = traceback.format_exc()
+    return output.getvalue(), error, time.perf_counter() - begin
+
+def programs(paths):
+    """
+    Returns the programs in paths, expanding directories and patterns.
+    """
+    items = []
+    for path in paths:
+        if os.path.isdir(path):
+            items.extend(sorted(glob.glob(os.path.join(path, "*.txt"))))
+        elif glob.has_magic(path):
+            items.extend(sorted(glob.glob(path)))
+        else:
+            items.append(path)
+    return items
+
+def lines(paths):
+    items = []
+    for path in paths:
+        f = open(path, "r")
+        items.extend(f.readlines())
+        f.close()
+    return items
+
+def runAll(items, options=(), workers=None, chunk=None):
+    """
+    Runs items on workers processes, handing them out chunk at a time
+    (enough for four chunks per worker by default). Returns the results of
+    run() in the order of items.
+    """
+    workers = workers or os.cpu_count() or 1
+    chunk = chunk or max(1, len(items) // (workers * 4))
+    with concurrent.futures.ProcessPoolExecutor(workers, initializer=start,
+                                                initargs=(list(options),)) as executor:
+        return list(executor.map(run, items, chunksize=chunk))
+
+def report(items, results, elapsed):
+    """
+    Returns the time each item took as a table, slowest first, with the
+    totals.
+    """
+    rows = ["%10s  %s" % ("seconds", "item")]
+    for seconds, item in sorted(((r[2], i) for i, r in zip(items, results)), reverse=True):
+        rows.append("%10.6f  %s" % (seconds, item.strip()))
+    total = sum(r[2] for r in results)
+    rows.append("%10.6f  total in the workers" % total)
+    rows.append("%10.6f  wall clock, %d items, %.1f items/s"
+                % (elapsed, len(items), len(items) / elapsed if elapsed else 0))
+    return "\n".join(rows) + "\n"
+
+def main(argv):
+    options = [a for a in argv[1:] if a.startswith("--")]
+    arguments = [a for a in argv[1:] if not a.startswith("--")]
+    workers = None
+    chunk = None
+    for option in options:
+        if option.startswith("--workers="):
+            workers = int(option.partition("=")[2])
+        if option.startswith("--chunk="):
+            chunk = int(option.partition("=")[2])
+
+    if "--lines" in options:
+        items = lines(arguments)
+    else:
+        items = programs(arguments)
+
+    begin = time.perf_counter()
+    results = runAll(items, options, workers, chunk)
+    elapsed = time.perf_counter() - begin
+
+    for item, (output, error, seconds) in zip(items, results):
+        if "--lines" not in options:
+            print("==> %s <==" % item)
+        sys.stdout.write(output)
+        if error is not None:
+            sys.stderr.write("%s: %s" % (item.strip(), error))
+    if "--report" in options:
+        sys.stderr.write(report(items, results, elapsed))
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,209 @@
+"""
+Times the Seawolf programs in benchmarks/, split into lexing, parsing and
+evaluation.
+
+The programs in benchmarks/seawolf/ run on Seawolf.py and those in
+benchmarks/base/ on SeawolfBase.py, each on one Interpreter per language
+(reset before every run), so the parsers are only built once. A program is
+run warmup times first and then timed repeat times. Each timed run is
+split into:
+- lex: the parser's lexer scanning the program on its own;
+- parse: the parser, lexer included, less lex. The lexer is driven by the
+  parser and backs up when a rule fails, so this is what parsing costs
+  beyond one scan of the tokens;
+- eval: the rest of Interpreter.run(): the passes that were asked for,
+  resolving and running the program.
+total is the time of run(), so lex, parse and eval add up to it.
+
+Run "python SeawolfBench.py [options] [NAME...]" to run the benchmarks
+whose names (like "seawolf/gcd" or just "gcd") are given, or all of them.
+--repeat=N and --warmup=N set the number of runs (5 and 1 by default),
+--json prints the results as JSON instead of a table and --json=FILE
+writes them to FILE as well, and --compare=FILE compares the median total
+times with those of an earlier --json=FILE. The other options are those of
+Seawolf.py and SeawolfBase.py (--vm, --tiered, --optimize, ...), passed on
+to the interpreters, so that runs of one mode can be compared with another.
+"""
+import contextlib
+import gc
+import glob
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks")
+languages = ("seawolf", "base")
+phases = ("lex", "parse", "eval", "total")
+
+def benchmarks(names=()):
+    """
+    Returns the (name, language, path) of the benchmarks whose names are
+    in names, or of all of them.
+    """
+    found = []
+    for language in languages:
+        for path in sorted(glob.glob(os.path.join(directory, language, "*.txt"))):
+            base = os.path.splitext(os.path.basename(path))[0]
+            name = language + "/" + base
+            if not names or name in names or base in names:
+                found.append((name, language, path))
+    return found
+
+class TimedParser(object):
+    """
+    Stands in for the parser of an interpreter, remembering how long the
+    last parse took.
+    """
+
+    def __init__(self, parse):
+        self.parse = parse
+        self.lexer = parse.lexer
+        self.elapsed = 0.0
+
+    def __call__(self, source):
+        begin = time.perf_counter()
+        try:
+            return self.parse(source)
+        finally:
+            self.elapsed = time.perf_counter() - begin
+
+def lex(lexer, source):
+    """
+    Scans source with lexer. Returns the number of tokens.
+    """
+    lexer.start(source)
+    count = 1
+    while not lexer.eof():
+        lexer.next_token()
+        count += 1
+    return count
+
+def build(language, options):
+    if language == "base":
+        import SeawolfBase
+        interpreter = SeawolfBase.configure(options)
+    else:
+        import Seawolf
+        interpreter = Seawolf.configure(options)
+    interpreter.parse = TimedParser(interpreter.parse)
+    return interpreter
+
+def measure(interpreter, source):
+    """
+    Runs source once on interpreter. Returns the seconds each phase took
+    and what the program printed.
+    """
+    output = io.StringIO()
+    interpreter.reset()
+    gc.collect()
+    begin = time.perf_counter()
+    lex(interpreter.parse.lexer, source)
+    lexed = time.perf_counter() - begin
+    with contextlib.redirect_stdout(output), contextlib.redirect_stderr(io.StringIO()):
+        begin = time.perf_counter()
+        interpreter.run(source)
+        total = time.perf_counter() - begin
+    parsed = interpreter.parse.elapsed
+    times = {"lex": lexed, "parse": max(parsed - lexed, 0.0), "eval": total - parsed,
+             "total": total}
+    return times, output.getvalue()
+
+def summary(seconds):
+    return {"min": min(seconds), "median": statistics.median(seconds),
+            "mean": statistics.mean(seconds),
+            "stdev": statistics.stdev(seconds) if len(seconds) > 1 else 0.0,
+            "max": max(seconds)}
+
+def runAll(names=(), options=(), repeat=5, warmup=1):
+    """
+    Runs the benchmarks named in names (all of them by default). Returns
+    the results as a dictionary, ready to be written as JSON.
+    """
+    interpreters = {}
+    results = []
+    for name, language, path in benchmarks(names):
+        if language not in interpreters:
+            interpreters[language] = build(language, options)
+        f = open(path, "r")
+        source = f.read()
+        f.close()
+        for i in range(warmup):
+            measure(interpreters[language], source)
+        runs = []
+        for i in range(repeat):
+            times, output = measure(interpreters[language], source)
+            runs.append(times)
+        result = {"name": name, "language": language, "bytes": len(source),
+                  "lines": source.count("\n"), "tokens": lex(interpreters[language].parse.lexer, source),
+                  "output": output}
+        for phase in phases:
+            seconds = [times[phase] for times in runs]
+            result[phase] = summary(seconds)
+            result[phase]["runs"] = seconds
+        results.append(result)
+    return {"python": platform.python_version(), "implementation": platform.python_implementation(),
+            "options": list(options), "repeat": repeat, "warmup": warmup, "benchmarks": results}
+
+def report(results):
+    """
+    Returns the median time of each phase, in milliseconds, as a table.
+    """
+    rows = ["%-22s %8s %10s %10s %10s %10s %8s" % ("benchmark", "tokens", "lex", "parse", "eval",
+                                                   "total", "stdev")]
+    for result in results["benchmarks"]:
+        rows.append("%-22s %8d %10.3f %10.3f %10.3f %10.3f %8.3f" % (
+            result["name"], result["tokens"], result["lex"]["median"] * 1e3,
+            result["parse"]["median"] * 1e3, result["eval"]["median"] * 1e3,
+            result["total"]["median"] * 1e3, result["total"]["stdev"] * 1e3))
+    return "\n".join(rows) + "\n"
+
+def compare(results, earlier):
+    """
+    Returns the median total times of the benchmarks in both results, in
+    milliseconds, and how many times longer they take now.
+    """
+    before = dict((result["name"], result) for result in earlier["benchmarks"])
+    rows = ["%-22s %10s %10s %8s" % ("benchmark", "before", "now", "ratio")]
+    for result in results["benchmarks"]:
+        if result["name"] in before:
+            old = before[result["name"]]["total"]["median"]
+            new = result["total"]["median"]
+            rows.append("%-22s %10.3f %10.3f %7.2fx" % (result["name"], old * 1e3, new * 1e3,
+                                                       new / old if old else 0))
+    return "\n".join(rows) + "\n"
+
+def main(argv):
+    options = [a for a in argv[1:] if a.startswith("--")]
+    arguments = [a for a in argv[1:] if not a.startswith("--")]
+    repeat = 5
+    warmup = 1
+    for option in options:
+        if option.startswith("--repeat="):
+            repeat = int(option.partition("=")[2])
+        if option.startswith("--warmup="):
+            warmup = int(option.partition("=")[2])
+
+    results = runAll(arguments, options, repeat, warmup)
+
+    if "--json" in options:
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        sys.stdout.write(report(results))
+    for option in options:
+        if option.startswith("--json="):
+            f = open(option.partition("=")[2], "w")
+            json.dump(results, f, indent=2)
+            f.close()
+        if option.startswith("--compare="):
+            f = open(option.partition("=")[2], "r")
+            earlier = json.load(f)
+            f.close()
+            sys.stderr.write(compare(results, earlier))
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,80 @@
+"""
+Step budgets and deadlines for Seawolf programs.
+
+The interpreters count a step at every place a program can go on for
+long: each iteration of a while loop in SeawolfBase.py, each call in
+Seawolf.py. When a program is given a Budget they switch to versions of
+those places that call tick(), which stops the program with
+BudgetExceeded once it has taken more steps than it may or runs past its
+deadline. Without a Budget nothing is counted.
+"""
+import time
+
+class BudgetExceeded(Exception):
+    """
+    Raised when a program runs out of steps or time.
+    """
+
+class Budget(object):
+    """
+    At most steps steps and seconds seconds per program, either of them
+    None for no limit. The clock is read once every interval steps.
+    """
+
+    def __init__(self, steps=None, seconds=None, interval=1000):
+        self.steps = steps
+        self.seconds = seconds
+        self.interval = interval
+        self.start()
+
+    def start(self):
+        """
+        Starts counting a program from nothing.
+        """
+        self.taken = 0
+        self.deadline = None
+        if self.seconds is not None:
+            self.deadline = time.monotonic() + self.seconds
+        self.refill()
+
+    def refill(self):
+        # Steps are counted down in chunks, so that tick() only decrements
+        # and compares until the chunk runs out.
+        chunk = self.interval
+        if self.steps is not None:
+            chunk = min(chunk, self.steps - self.taken)
+        self.chunk = chunk
+        self.countdown = chunk
+
+    def tick(self):
+        self.countdown -= 1
+        if self.countdown < 0:
+            self.expire()
+
+    def expire(self):
+        """
+        Called on the step after a chunk ran out.
+        """
+        self.taken += self.chunk
+        if self.steps is not None and self.taken >= self.steps:
+            raise BudgetExceeded("more than %d steps" % self.steps)
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise BudgetExceeded("more than %g seconds" % self.seconds)
+        self.refill()
+        self.countdown -= 1
+
+def configure(options):
+    """
+    Returns the Budget set by the command line options --steps=N and
+    --timeout=SECONDS, or None if there are neither.
+    """
+    steps = None
+    seconds = None
+    for option in options:
+        if option.startswith("--steps="):
+            steps = int(option.partition("=")[2])
+        if option.startswith("--timeout="):
+            seconds = float(option.partition("=")[2])
+    if steps is None and seconds is None:
+        return None
+    return Budget(steps, seconds)
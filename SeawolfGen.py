@@ -0,0 +1,297 @@
+"""
+Generates random Seawolf programs of a given size, and the output they
+must print, for finding out how the interpreters scale.
+
+A Generator makes the same program for the same seed. The program sizes
+can be set along four axes:
+- statements: the number of statements in the main block;
+- depth: how deeply the if/else chain in the main block nests;
+- functions: the number of functions defined (Seawolf.py only), each
+  called once, some of them calling others;
+- elements: the number of elements of a list literal (SeawolfBase.py only),
+  some of which are read.
+The generator works out what each statement it writes does as it goes, so
+it knows what the program prints without running it. All values stay
+between 0 and 999.
+
+Run "python SeawolfGen.py [options]" to print a program, with --expected
+to print what it must print instead. --seed=N, --statements=N, --depth=N,
+--functions=N and --elements=N set its seed and size, and --base makes a
+program for SeawolfBase.py. "--scale=AXIS --sizes=N,N,..." instead runs
+programs of each size along AXIS (the others as set) and prints how long
+each phase took (see SeawolfBench.py), the peak memory of the run, the
+time per line and whether the output was right. The options of the
+interpreters, like --vm, are passed on.
+"""
+import json
+import random
+import sys
+import traceback
+import tracemalloc
+
+axes = ("statements", "depth", "functions", "elements")
+
+class Generator(object):
+    """
+    Writes a program for Seawolf.py, or with base for SeawolfBase.py, and
+    keeps track of what it prints.
+    """
+
+    def __init__(self, seed=0, base=False, variables=8):
+        self.random = random.Random(seed)
+        self.base = base
+        self.names = ["x%d" % i for i in range(variables)]
+        self.values = {}
+        # name -> (multiplier, offset, the function called or None)
+        self.functions = {}
+        self.lists = {}
+        self.lines = []
+        self.output = []
+
+    def write(self, indent, text):
+        # Deep nesting would make the indents grow with the square of it.
+        self.lines.append("    " * min(indent, 16) + text)
+
+    def term(self):
+        """
+        Returns the text and value of a variable, an element of a list or
+        a number.
+        """
+        choice = self.random.random()
+        if self.lists and choice < 0.2:
+            name = self.random.choice(sorted(self.lists))
+            index = self.random.randrange(len(self.lists[name]))
+            return "%s[%d]" % (name, index), self.lists[name][index]
+        if choice < 0.7:
+            name = self.random.choice(self.names)
+            return name, self.values[name]
+        value = self.random.randrange(1, 100)
+        return str(value), value
+
+    def expression(self):
+        """
+        Returns the text and value of an expression of a few terms, kept
+        below 1000.
+        """
+        text, value = self.term()
+        for i in range(self.random.randrange(1, 3)):
+            operator = self.random.choice("+-*")
+            right, operand = self.term()
+            text = "(%s %s %s)" % (text, operator, right)
+            if operator == "+":
+                value = value + operand
+            elif operator == "-":
+                value = value - operand
+            else:
+                value = value * operand
+        return "(%s %% 1000)" % text, value % 1000
+
+    def condition(self):
+        text, value = self.term()
+        modulus = self.random.randrange(2, 5)
+        return "((%s %% %d) == 0)" % (text, modulus), value % modulus == 0
+
+    def call(self, name, a, b):
+        """
+        Works out what the function name returns for a and b.
+        """
+        multiplier, offset, callee = self.functions[name]
+        if a < b or callee is None:
+            return (a * multiplier + b + offset) % 1000
+        return self.call(callee, b, (a + offset) % 1000)
+
+    def statement(self, indent, live):
+        """
+        Writes an assignment, a print or a call. live is whether it runs.
+        """
+        choice = self.random.random()
+        name = self.random.choice(self.names)
+        if choice < 0.15:
+            if self.base:
+                self.write(indent, "print %s;" % name)
+            else:
+                self.write(indent, "print(%s);" % name)
+            if live:
+                self.printed(self.values[name])
+        elif self.functions and choice < 0.3:
+            function = self.random.choice(sorted(self.functions))
+            a = self.random.choice(self.names)
+            b = self.random.choice(self.names)
+            self.write(indent, "%s = %s(%s, %s);" % (name, function, a, b))
+            if live:
+                self.values[name] = self.call(function, self.values[a], self.values[b])
+        else:
+            text, value = self.expression()
+            self.write(indent, "%s = %s;" % (name, text))
+            if live:
+                self.values[name] = value
+
+    def printed(self, value):
+        if self.base:
+            self.output.append("Console print:  %s" % value)
+        else:
+            self.output.append(str(value))
+
+    def nest(self, indent, depth):
+        """
+        Writes depth if/else statements, each in the branch of the one
+        before that runs.
+        """
+        # What is left to write of each if/else once the ones in it are
+        # written: its indent, and whether its else branch is.
+        closing = []
+        for level in range(depth):
+            text, taken = self.condition()
+            self.write(indent + level, ("if %s {" if self.base else "if (%s) {") % text)
+            if taken:
+                self.statement(indent + level + 1, True)
+            else:
+                self.statement(indent + level + 1, False)
+                self.write(indent + level, "} else {")
+                self.statement(indent + level + 1, True)
+            closing.append((indent + level, taken))
+        for indent, taken in reversed(closing):
+            if taken:
+                self.write(indent, "} else {")
+                self.statement(indent + 1, False)
+            self.write(indent, "}")
+
+    def define(self, count):
+        for i in range(count):
+            name = "f%d" % i
+            multiplier = self.random.randrange(2, 10)
+            offset = self.random.randrange(0, 100)
+            callee = "f%d" % (i - 1) if i % 4 else None
+            self.functions[name] = (multiplier, offset, callee)
+            self.write(0, "%s(a, b){" % name)
+            if callee is None:
+                self.write(1, "return (((a * %d) + b) + %d) %% 1000;" % (multiplier, offset))
+            else:
+                self.write(1, "if (a < b) {")
+                self.write(2, "return (((a * %d) + b) + %d) %% 1000;" % (multiplier, offset))
+                self.write(1, "} else {")
+                self.write(2, "return %s(b, (a + %d) %% 1000);" % (callee, offset))
+                self.write(1, "}")
+            self.write(0, "}")
+
+    def program(self, statements=100, depth=0, functions=0, elements=0):
+        """
+        Returns the source of a program of the given size and what it
+        prints.
+        """
+        if self.base and functions:
+            raise ValueError("SeawolfBase.py has no functions")
+        if not self.base and elements:
+            raise ValueError("Seawolf.py has no lists")
+        self.define(functions)
+        self.write(0, "{")
+        for name in self.names:
+            self.values[name] = self.random.randrange(1000)
+            self.write(1, "%s = %d;" % (name, self.values[name]))
+        if elements:
+            values = [self.random.randrange(1000) for i in range(elements)]
+            self.write(1, "l0 = [%s];" % ", ".join(str(value) for value in values))
+            self.lists["l0"] = values
+        for i in range(statements):
+            self.statement(1, True)
+        self.nest(1, depth)
+        for i in range(functions):
+            name = self.random.choice(self.names)
+            a, b = self.random.choice(self.names), self.random.choice(self.names)
+            self.write(1, "%s = f%d(%s, %s);" % (name, i, a, b))
+            self.values[name] = self.call("f%d" % i, self.values[a], self.values[b])
+        for name in self.names:
+            self.write(1, ("print %s;" if self.base else "print(%s);") % name)
+            self.printed(self.values[name])
+        self.write(0, "}")
+        return "\n".join(self.lines) + "\n", "\n".join(self.output) + "\n"
+
+def generate(seed=0, base=False, **sizes):
+    """
+    Returns the source of a program and what it prints.
+    """
+    return Generator(seed, base).program(**sizes)
+
+def scale(axis, sizes, seed=0, base=False, options=(), fixed=None):
+    """
+    Runs programs of each of sizes along axis on an interpreter set up by
+    options. Returns a row per size, with the times of SeawolfBench and the
+    peak memory of the run in bytes.
+    """
+    import SeawolfBench
+    language = "base" if base else "seawolf"
+    interpreter = SeawolfBench.build(language, options)
+    rows = []
+    for size in sizes:
+        program = dict(fixed or {})
+        program[axis] = size
+        source, expected = generate(seed, base, **program)
+        row = {"size": size, "lines": source.count("\n"), "bytes": len(source)}
+        try:
+            times, output = SeawolfBench.measure(interpreter, source)
+            row.update(times)
+            row["correct"] = output == expected
+            interpreter.reset()
+            tracemalloc.start()
+            try:
+                SeawolfBench.measure(interpreter, source)
+                row["memory"] = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+        except Exception:
+            row["error"] = traceback.format_exc().strip().splitlines()[-1]
+        rows.append(row)
+    return rows
+
+def report(axis, rows):
+    """
+    Returns the rows of scale() as a table, with the times in milliseconds
+    and the memory in kilobytes.
+    """
+    lines = ["%10s %8s %10s %10s %10s %10s %12s  %s" % (axis, "lines", "lex", "parse", "eval",
+                                                       "memory", "us/line", "output")]
+    for row in rows:
+        if "error" in row:
+            lines.append("%10d %8d  %s" % (row["size"], row["lines"], row["error"]))
+            continue
+        lines.append("%10d %8d %10.3f %10.3f %10.3f %10d %12.3f  %s" % (
+            row["size"], row["lines"], row["lex"] * 1e3, row["parse"] * 1e3, row["eval"] * 1e3,
+            row["memory"] // 1024, row["total"] * 1e6 / row["lines"],
+            "ok" if row["correct"] else "WRONG"))
+    return "\n".join(lines) + "\n"
+
+def main(argv):
+    options = [a for a in argv[1:] if a.startswith("--")]
+    seed = 0
+    sizes = {}
+    axis = None
+    series = []
+    for option in options:
+        name, equals, value = option[2:].partition("=")
+        if name == "seed":
+            seed = int(value)
+        if name in axes:
+            sizes[name] = int(value)
+        if name == "scale":
+            axis = value
+        if name == "sizes":
+            series = [int(size) for size in value.split(",")]
+    base = "--base" in options
+
+    if axis is not None:
+        rows = scale(axis, series, seed, base, options, sizes)
+        if "--json" in options:
+            json.dump(rows, sys.stdout, indent=2)
+            sys.stdout.write("\n")
+        else:
+            sys.stdout.write(report(axis, rows))
+        return
+
+    source, expected = generate(seed, base, **sizes)
+    if "--expected" in options:
+        sys.stdout.write(expected)
+    else:
+        sys.stdout.write(source)
+
+if __name__ == "__main__":
+    main(sys.argv)
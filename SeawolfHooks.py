@@ -0,0 +1,66 @@
+"""
+Hooks for watching Seawolf programs run without changing the interpreters.
+
+A Hooks object holds the functions registered for each event, called with:
+- "call": the name of a function of Seawolf.py and its arguments, when
+  a call of it starts;
+- "return": the name and the result, when the call ends. A call ending in
+  a tail call returns the TailCall it hands on, just before that call
+  starts;
+- "statement": the statement node, just before it runs (its line is in
+  node.line in Seawolf.py);
+- "loop": the WHILE node of SeawolfBase.py, before each iteration;
+- "error": the exception a program stops with.
+
+An Interpreter given a Hooks switches its nodes, when a program starts, to
+versions that pass on the events hooks are registered for; the nodes of
+the other events, and all of them without a Hooks, run as if there were no
+hooks at all. So a hook added while a program runs is seen from the next
+one on. Only the tree walkers report events: SeawolfVM, functions compiled
+by the tiered mode and calls answered by a memo cache are not seen.
+"""
+
+events = ("call", "return", "statement", "loop", "error")
+
+class Hooks(object):
+
+    def __init__(self):
+        self.hooks = dict((event, []) for event in events)
+
+    def add(self, event, hook):
+        """
+        Registers hook for event, and returns it.
+        """
+        if event not in self.hooks:
+            raise ValueError("no event %r" % event)
+        self.hooks[event].append(hook)
+        return hook
+
+    def remove(self, event, hook):
+        self.hooks[event].remove(hook)
+
+    def wants(self, *events):
+        """
+        Whether any hooks are registered for events.
+        """
+        return any(self.hooks[event] for event in events)
+
+    def call(self, name, args):
+        for hook in self.hooks["call"]:
+            hook(name, args)
+
+    def returned(self, name, result):
+        for hook in self.hooks["return"]:
+            hook(name, result)
+
+    def statement(self, node):
+        for hook in self.hooks["statement"]:
+            hook(node)
+
+    def loop(self, node):
+        for hook in self.hooks["loop"]:
+            hook(node)
+
+    def error(self, error):
+        for hook in self.hooks["error"]:
+            hook(error)
@@ -0,0 +1,210 @@
+"""
+The second tier of Seawolf.py's tiered mode.
+
+compileFunction() turns the body of a hot Function into Python source, with
+parameters and assigned variables as Python locals, Seawolf if/else as
+Python if/else and calls to itself as direct Python calls, and compiles it
+with the builtin compile(). Seawolf.Function.call then runs the result
+instead of walking the tree.
+"""
+import Seawolf
+from Seawolf import (IntLiteral, Variable, Assign, Print, Operation, Compare,
+                     Block, Return, If, Else, ProcedureCall, assigned)
+
+class Unsupported(Exception):
+    """
+    Raised for bodies the generator cannot translate, such as ones that
+    define functions of their own. Those stay interpreted.
+    """
+
+def name(variable):
+    # Prefixed so Seawolf names never clash with Python keywords, builtins
+    # or the helpers in the generated module.
+    return "v_" + variable
+
+def functionName(function):
+    return "f_" + function
+
+class Generator(object):
+    """
+    Writes the Python source of one function.
+    """
+
+    def __init__(self, function):
+        self.function = function
+        self.locals = set(function.params) | set(assigned(function.body, []))
+        self.lines = []
+
+    def generate(self):
+        params = ", ".join(name(p) for p in self.function.params)
+        self.emit(0, "def %s(%s):" % (functionName(self.function.name), params))
+        tailCalls = self.tailCalls(self.function.body, [])
+        # Tail calls to other functions are handed back to Function.call as
+        # TailCall results; then direct calls to itself have to settle them.
+        self.settles = not all(self.isSelfTailCall(r) for r in tailCalls)
+        depth = 1
+        if any(self.isSelfTailCall(r) for r in tailCalls):
+            # Tail calls to itself rebind the parameters and go round again.
+            self.emit(depth, "while True:")
+            depth += 1
+        if Seawolf.budget is not None:
+            # Every call of the function, from wherever, starts here, and
+            # Function.countedRun leaves compiled functions to count their
+            # own calls.
+            self.emit(depth, "tick()")
+        # Globals cannot change while a function runs (assignments always go
+        # to the innermost frame), so locals that are read before they are
+        # assigned can take the global value on entry. unbound means there
+        # is none and reading them fails, as in the tree walker.
+        for variable in sorted(self.locals - set(self.function.params)):
+            self.emit(depth, "%s = stack[0][%d]"
+                      % (name(variable), Seawolf.globalSlots[variable]))
+        self.statement(self.function.body, depth)
+        self.emit(depth, "return None")
+        return "\n".join(self.lines) + "\n"
+
+    def isSelfTailCall(self, node):
+        return (isinstance(node, Return) and isinstance(node.value, ProcedureCall)
+                and node.value.left.value == self.function.name
+                and len(node.value.param) == len(self.function.params))
+
+    def tailCalls(self, node, returns):
+        """
+        Collects the "return f(...)" statements in a statement.
+        """
+        if isinstance(node, Block):
+            for statement in node.statements:
+                self.tailCalls(statement, returns)
+        elif isinstance(node, If):
+            self.tailCalls(node.right, returns)
+        elif isinstance(node, Else):
+            self.tailCalls(node.right1, returns)
+            self.tailCalls(node.right2, returns)
+        elif isinstance(node, Return) and isinstance(node.value, ProcedureCall):
+            returns.append(node)
+        return returns
+
+    def emit(self, depth, line):
+        self.lines.append("    " * depth + line)
+
+    def statement(self, node, depth):
+        if isinstance(node, Block):
+            if not node.statements:
+                self.emit(depth, "pass")
+            for statement in node.statements:
+                self.statement(statement, depth)
+        elif isinstance(node, Assign):
+            self.emit(depth, "%s = %s" % (name(node.left.value),
+                                          self.expression(node.right)))
+        elif isinstance(node, Print):
+            self.emit(depth, "print(%s)" % self.expression(node.value))
+        elif self.isSelfTailCall(node):
+            if self.function.params:
+                self.emit(depth, "%s, = %s," % (
+                    ", ".join(name(p) for p in self.function.params),
+                    ", ".join(self.expression(p) for p in node.value.param)))
+            self.emit(depth, "continue")
+        elif isinstance(node, Return) and isinstance(node.value, ProcedureCall):
+            self.emit(depth, "return tailCall(%r, [%s])" % (
+                node.value.left.value,
+                ", ".join(self.expression(p) for p in node.value.param)))
+        elif isinstance(node, Return):
+            self.emit(depth, "return %s" % self.expression(node.value))
+        elif isinstance(node, If):
+            self.emit(depth, "if %s:" % self.condition(node.left))
+            self.statement(node.right, depth + 1)
+        elif isinstance(node, Else):
+            self.emit(depth, "if %s:" % self.condition(node.left))
+            self.statement(node.right1, depth + 1)
+            self.emit(depth, "else:")
+            self.statement(node.right2, depth + 1)
+        elif isinstance(node, ProcedureCall):
+            self.emit(depth, self.expression(node))
+        else:
+            raise Unsupported(type(node).__name__)
+
+    def condition(self, node):
+        # A comparison tested by if/else does not need turning into 1 or 0.
+        if isinstance(node, Compare):
+            return "%s %s %s" % (self.expression(node.left), node.operate,
+                                 self.expression(node.right))
+        return self.expression(node)
+
+    def expression(self, node):
+        if isinstance(node, IntLiteral):
+            return repr(node.value)
+        if isinstance(node, Variable):
+            if node.value in self.function.params:
+                return name(node.value)
+            if node.value in self.locals:
+                return "(%s if %s is not unbound else missing(%r))" % (
+                    name(node.value), name(node.value), node.value)
+            return "globalValue(%d, %r)" % (node.globalSlot, node.value)
+        if isinstance(node, Operation):
+            return "(%s %s %s)" % (self.expression(node.left), node.operate,
+                                   self.expression(node.right))
+        if isinstance(node, Compare):
+            return "(1 if %s else 0)" % self.condition(node)
+        if isinstance(node, ProcedureCall):
+            args = [self.expression(p) for p in node.param]
+            callee = node.left.value
+            # Memoized functions have to go through their cache.
+            if (callee == self.function.name and len(args) == len(self.function.params)
+                    and self.function.cache is None):
+                if self.settles:
+                    return "settle(%s(%s))" % (functionName(callee), ", ".join(args))
+                return "%s(%s)" % (functionName(callee), ", ".join(args))
+            return "call(%r, [%s])" % (callee, ", ".join(args))
+        raise Unsupported(type(node).__name__)
+
+def globalValue(slot, variable):
+    value = Seawolf.stack[0][slot]
+    if value is Seawolf.unbound:
+        raise KeyError(variable)
+    return value
+
+def missing(variable):
+    raise KeyError(variable)
+
+def lookup(function, args):
+    function = Seawolf.functionMap[function]
+    if len(args) != len(function.params):
+        raise Seawolf.SemanticError()
+    return function
+
+def tailCall(function, args):
+    return Seawolf.TailCall(lookup(function, args), args)
+
+def settle(result):
+    """
+    Finishes a call that ended in a tail call to another function.
+    """
+    if type(result) is Seawolf.TailCall:
+        return result.function.call(result.args)
+    return result
+
+def call(function, args):
+    """
+    Calls another Seawolf function through functionMap, so it is interpreted
+    or compiled depending on its own tier.
+    """
+    return lookup(function, args).call(args)
+
+def compileFunction(function):
+    """
+    Returns a Python function running the body of function, or None if the
+    body uses something the generator cannot translate.
+    """
+    generator = Generator(function)
+    try:
+        source = generator.generate()
+    except Unsupported:
+        return None
+    namespace = {"stack": Seawolf.stack, "unbound": Seawolf.unbound,
+                 "globalValue": globalValue, "missing": missing, "call": call,
+                 "tailCall": tailCall, "settle": settle,
+                 "tick": Seawolf.budget and Seawolf.budget.tick}
+    exec(compile(source, "<seawolf %s>" % function.name, "exec"), namespace)
+    compiled = namespace[functionName(function.name)]
+    compiled.source = source
+    return compiled
@@ -0,0 +1,106 @@
+"""
+Memoization of pure Seawolf functions.
+
+analyze() marks the ProcDefs whose result only depends on their arguments:
+they print nothing, define no functions, read no variable the top level
+assigns and only call functions that are pure themselves. When
+Seawolf.memoSize is set, ProcDef.evaluate hands the functions it defines
+from those to memoize(), which puts a Cache in front of them.
+"""
+import collections
+
+import Seawolf
+from Seawolf import (Variable, Print, ProcDef, ProcedureCall, assigned,
+                     nodes)
+
+def definitions(program):
+    """
+    Returns every ProcDef in the program, nested ones included.
+    """
+    return [n for n in nodes(program) if isinstance(n, ProcDef)]
+
+def analyze(program):
+    """
+    Sets pure on the ProcDefs of a resolved program.
+    """
+    procDefs = definitions(program)
+    counts = collections.Counter(d.left.value for d in procDefs)
+    topLevel = set(assigned(program, []))
+
+    callees = {}
+    for d in procDefs:
+        params = set(p.value for p in d.param)
+        calls = set()
+        d.pure = True
+        for n in nodes(d.right):
+            if isinstance(n, (Print, ProcDef)):
+                d.pure = False
+            elif isinstance(n, Variable):
+                # Globals, and locals read before they are assigned, come
+                # from the top level, which may change them between calls.
+                if n.value not in params and (n.slot is None or n.value in topLevel):
+                    d.pure = False
+            elif isinstance(n, ProcedureCall):
+                calls.add(n.left.value)
+        callees[d] = calls
+
+    # Calls to impure, unknown or redefined functions make the caller
+    # impure too; repeat until nothing changes.
+    pure = dict((d.left.value, d) for d in procDefs if d.pure and counts[d.left.value] == 1)
+    changed = True
+    while changed:
+        changed = False
+        for name, d in list(pure.items()):
+            if not callees[d] <= set(pure):
+                del pure[name]
+                changed = True
+    for d in procDefs:
+        d.pure = d.left.value in pure and pure[d.left.value] is d
+
+class Cache(object):
+    """
+    The last size results of a function, keyed by its arguments, with the
+    least recently used one evicted first.
+    """
+
+    def __init__(self, function, size):
+        self.function = function
+        self.size = size
+        self.results = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def call(self, args):
+        key = tuple(args)
+        results = self.results
+        if key in results:
+            self.hits += 1
+            results.move_to_end(key)
+            return results[key]
+        self.misses += 1
+        result = self.function.run(args)
+        results[key] = result
+        if len(results) > self.size:
+            results.popitem(last=False)
+            self.evictions += 1
+        return result
+
+def memoize(function, size):
+    cache = Cache(function, size)
+    function.cache = cache
+    function.call = cache.call
+
+def report():
+    """
+    Returns the counters of every memoized function as a table.
+    """
+    lines = ["%-20s %10s %10s %10s %10s" % ("function", "hits", "misses",
+                                            "evictions", "cached")]
+    for function in Seawolf.functionMap.values():
+        cache = function.cache
+        if cache is not None:
+            lines.append("%-20s %10d %10d %10d %10d" % (
+                function.name, cache.hits, cache.misses, cache.evictions,
+                len(cache.results)))
+    return "\n".join(lines) + "\n"
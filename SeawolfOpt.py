@@ -0,0 +1,260 @@
+"""
+The optimization passes for Seawolf.py programs, run by main() between
+parse() and resolve() when --optimize is given.
+
+inline replaces calls to small functions with their bodies, fold computes
+operations on constants and merges chains of constant additions, dce drops
+statements that can never run, and strength removes operations that leave
+their operand unchanged and moves constants to the right of + and ==,
+where SeawolfVM has instructions taking them directly.
+"""
+import collections
+import copy
+
+from Seawolf import (IntLiteral, Variable, Assign, Print, Operation, Compare, Block,
+                     Return, If, Else, ProcDef, ProcedureCall, nodes,
+                     operations)
+from SeawolfPass import Pass, PassManager
+
+fields = {
+    Block: ("statements",),
+    Assign: ("right",),
+    Print: ("value",),
+    Return: ("value",),
+    Operation: ("left", "right"),
+    Compare: ("left", "right"),
+    If: ("left", "right"),
+    Else: ("left", "right1", "right2"),
+    ProcDef: ("right",),
+    ProcedureCall: ("param",)
+}
+
+def isConstant(node):
+    return isinstance(node, IntLiteral)
+
+def isInt(node):
+    """
+    Whether node evaluates to an int whenever it does not fail. Variables
+    and calls can hold None, the result of a function without a return.
+    """
+    return isinstance(node, (IntLiteral, Operation, Compare))
+
+def isValue(node, value):
+    return isConstant(node) and node.value == value
+
+class ConstantFolding(Pass):
+
+    name = "fold"
+    fields = fields
+
+    def visit(self, node):
+        if not isinstance(node, (Operation, Compare)):
+            return node
+        if isConstant(node.left) and isConstant(node.right):
+            try:
+                value = operations[node.operate](node.left.value, node.right.value)
+            except ZeroDivisionError:
+                # Left to fail when it runs.
+                return node
+            self.stats["operations"] += 1
+            if isinstance(node, Compare):
+                return IntLiteral(1 if value else 0)
+            return IntLiteral(value)
+        # (e + 1) - 1 and the like become e + 0, which strength removes.
+        left = node.left
+        if (isinstance(node, Operation) and node.operate in ("+", "-")
+                and isConstant(node.right) and isinstance(left, Operation)
+                and left.operate in ("+", "-") and isConstant(left.right)):
+            total = left.right.value if left.operate == "+" else -left.right.value
+            total += node.right.value if node.operate == "+" else -node.right.value
+            self.stats["constant chains"] += 1
+            if total < 0:
+                return Operation("-", left.left, IntLiteral(-total))
+            return Operation("+", left.left, IntLiteral(total))
+        return node
+
+def alwaysReturns(node):
+    if isinstance(node, Return):
+        return True
+    if isinstance(node, Block):
+        return any(alwaysReturns(s) for s in node.statements)
+    if isinstance(node, Else):
+        return alwaysReturns(node.right1) and alwaysReturns(node.right2)
+    return False
+
+def defines(node):
+    # Dropping a definition would change which calls link() can bind, so
+    # code holding one is kept.
+    return any(isinstance(n, ProcDef) for n in nodes(node))
+
+class DeadCode(Pass):
+
+    name = "dce"
+    fields = fields
+
+    def visit(self, node):
+        if isinstance(node, Block):
+            for i, statement in enumerate(node.statements):
+                if alwaysReturns(statement):
+                    dead = node.statements[i + 1:]
+                    if dead and not any(defines(s) for s in dead):
+                        self.stats["statements"] += len(dead)
+                        del node.statements[i + 1:]
+                    break
+        elif isinstance(node, If) and isConstant(node.left):
+            if node.left.value:
+                self.stats["branches"] += 1
+                return node.right
+            if not defines(node.right):
+                self.stats["branches"] += 1
+                return Block()
+        elif isinstance(node, Else) and isConstant(node.left):
+            taken, dropped = node.right1, node.right2
+            if not node.left.value:
+                taken, dropped = dropped, taken
+            if not defines(dropped):
+                self.stats["branches"] += 1
+                return taken
+        return node
+
+class StrengthReduction(Pass):
+
+    name = "strength"
+    fields = fields
+
+    def visit(self, node):
+        if not isinstance(node, (Operation, Compare)):
+            return node
+        left, right = node.left, node.right
+        # e + 0, 0 + e, e - 0, e * 1 and 1 * e are e, as long as e is an int.
+        identity = {"+": 0, "-": 0, "*": 1}.get(node.operate)
+        if isinstance(node, Operation) and identity is not None:
+            if isInt(left) and isValue(right, identity):
+                self.stats["identities"] += 1
+                return left
+            if node.operate != "-" and isValue(left, identity) and isInt(right):
+                self.stats["identities"] += 1
+                return right
+        if node.operate in ("+", "==") and isConstant(left) and not isConstant(right):
+            self.stats["constants moved"] += 1
+            node.left, node.right = right, left
+        return node
+
+def isSimple(node):
+    """
+    Whether node can be evaluated any number of times, in any order, with
+    the same result: it makes no calls.
+    """
+    return all(isinstance(n, (IntLiteral, Variable, Operation, Compare))
+               for n in nodes(node))
+
+def size(node):
+    return sum(1 for n in nodes(node))
+
+def calls(node):
+    return set(n.left.value for n in nodes(node) if isinstance(n, ProcedureCall))
+
+class Inliner(Pass):
+    """
+    Replaces calls to functions whose whole body is "return expression;",
+    with an expression of at most size nodes, by that expression with the
+    arguments in place of the parameters.
+
+    Only functions defined once, at the start of the program (before
+    anything else runs, so they are defined before any call), that are
+    not recursive and read nothing but their parameters are inlined. The
+    arguments have to make no calls, an argument used more than once has
+    to be a variable or a constant, and one not used at all a constant, so
+    the expression does the same work as the call did. Only the order the
+    arguments are evaluated in can change, which at most changes which of
+    two failing arguments is reported.
+    """
+
+    name = "inline"
+    fields = fields
+
+    def __init__(self, size=12):
+        Pass.__init__(self)
+        self.size = size
+
+    def run(self, node):
+        self.functions = self.candidates(node)
+        # Calls standing as statements are kept; their value is not used.
+        self.statements = set()
+        for n in nodes(node):
+            if isinstance(n, Block):
+                held = n.statements
+            elif isinstance(n, If):
+                held = [n.right]
+            elif isinstance(n, Else):
+                held = [n.right1, n.right2]
+            else:
+                continue
+            self.statements.update(id(s) for s in held if isinstance(s, ProcedureCall))
+        return self.rewrite(node)
+
+    def candidates(self, program):
+        definitions = collections.Counter(n.left.value for n in nodes(program)
+                                          if isinstance(n, ProcDef))
+        graph = dict((n.left.value, calls(n.right)) for n in nodes(program)
+                     if isinstance(n, ProcDef))
+        functions = {}
+        for statement in program.statements:
+            if not isinstance(statement, ProcDef):
+                break
+            name = statement.left.value
+            body = statement.right.statements
+            if (definitions[name] != 1 or len(body) != 1 or not isinstance(body[0], Return)
+                    or size(body[0].value) > self.size or self.reaches(graph, name, name)):
+                continue
+            params = [p.value for p in statement.param]
+            if all(n.value in params for n in nodes(body[0].value) if isinstance(n, Variable)):
+                functions[name] = (params, body[0].value)
+        return functions
+
+    def reaches(self, graph, start, target):
+        seen = set()
+        todo = list(graph.get(start, ()))
+        while todo:
+            name = todo.pop()
+            if name == target:
+                return True
+            if name not in seen:
+                seen.add(name)
+                todo.extend(graph.get(name, ()))
+        return False
+
+    def visit(self, node):
+        if (not isinstance(node, ProcedureCall) or node.left.value not in self.functions
+                or id(node) in self.statements):
+            return node
+        params, expression = self.functions[node.left.value]
+        if len(params) != len(node.param):
+            # Left for link() to report.
+            return node
+        uses = collections.Counter(n.value for n in nodes(expression) if isinstance(n, Variable))
+        for param, arg in zip(params, node.param):
+            if not isSimple(arg):
+                return node
+            if uses[param] > 1 and not isinstance(arg, (IntLiteral, Variable)):
+                return node
+            if uses[param] == 0 and not isinstance(arg, IntLiteral):
+                return node
+        self.stats["calls"] += 1
+        return self.substitute(copy.deepcopy(expression), dict(zip(params, node.param)))
+
+    def substitute(self, node, args):
+        if isinstance(node, Variable):
+            return copy.deepcopy(args[node.value])
+        if isinstance(node, (Operation, Compare)):
+            node.left = self.substitute(node.left, args)
+            node.right = self.substitute(node.right, args)
+        elif isinstance(node, ProcedureCall):
+            node.param = [self.substitute(p, args) for p in node.param]
+        return node
+
+def optimizer():
+    """
+    Returns a PassManager running all the passes above.
+    """
+    return PassManager([Inliner(), StrengthReduction(), ConstantFolding(), DeadCode()])
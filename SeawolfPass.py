@@ -0,0 +1,99 @@
+"""
+Optimization passes over Seawolf syntax trees, run between parsing and
+evaluation.
+
+A Pass rewrites a tree bottom up and counts what it changed. A PassManager
+runs a list of them, any of which can be turned off, until none of them
+finds anything more to do, and reports the counts. SeawolfOpt.py has the
+passes for Seawolf.py; SeawolfBase.py has its own.
+"""
+import collections
+
+class Pass(object):
+    """
+    A base class for passes. fields maps each node class to the names of
+    the attributes holding its children, which are either a node or a list
+    of nodes.
+    """
+
+    name = None
+    fields = {}
+
+    def __init__(self):
+        self.stats = collections.Counter()
+
+    def run(self, node):
+        """
+        Returns the rewritten tree.
+        """
+        return self.rewrite(node)
+
+    def rewrite(self, node):
+        """
+        Rewrites the children of node, then node itself with visit().
+        """
+        for field in self.fields.get(type(node), ()):
+            value = getattr(node, field)
+            if isinstance(value, list):
+                value[:] = [self.rewrite(v) for v in value]
+            else:
+                setattr(node, field, self.rewrite(value))
+        return self.visit(node)
+
+    def visit(self, node):
+        """
+        Returns what replaces node, whose children have been rewritten.
+        """
+        return node
+
+class PassManager(object):
+    """
+    Runs passes in order, all of them enabled unless disable() is called
+    with their name.
+    """
+
+    def __init__(self, passes, rounds=10):
+        self.passes = passes
+        self.rounds = rounds
+        self.disabled = set()
+
+    def names(self):
+        return [p.name for p in self.passes]
+
+    def enable(self, name):
+        self.disabled.discard(name)
+
+    def disable(self, name):
+        if name not in self.names():
+            raise KeyError(name)
+        self.disabled.add(name)
+
+    def run(self, node):
+        """
+        Returns the optimized tree. One pass can open up work for another,
+        such as a branch on a folded condition, so they are run again
+        until a round changes nothing.
+        """
+        for i in range(self.rounds):
+            before = self.changes()
+            for p in self.passes:
+                if p.name not in self.disabled:
+                    node = p.run(node)
+            if self.changes() == before:
+                break
+        return node
+
+    def changes(self):
+        return sum(sum(p.stats.values()) for p in self.passes)
+
+    def report(self):
+        """
+        Returns what each pass changed as a table.
+        """
+        lines = ["%-12s %-24s %8s" % ("pass", "change", "count")]
+        for p in self.passes:
+            if p.name in self.disabled:
+                lines.append("%-12s %-24s %8s" % (p.name, "(disabled)", ""))
+            for change, count in sorted(p.stats.items()):
+                lines.append("%-12s %-24s %8d" % (p.name, change, count))
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,165 @@
+"""
+A deterministic profiler for Seawolf.py programs run by the tree walker.
+
+instrument() overrides, on the nodes of one resolved program, the
+evaluate() of every statement, to count how often it runs, and of every
+function body, to time each call. A call's inclusive time runs from the
+start to the end of its body; its exclusive time leaves out the calls it
+makes. A tail call ends the caller's body before the callee's starts, so
+it shows up as a call from the caller's caller. Calls answered by a memo
+cache and functions compiled by the tiered mode are not seen.
+
+report() returns the functions and the statements as tables. collapsed()
+returns the exclusive time of every call stack in the format flame graph
+tools read, and dump() writes the function times in the format of the
+pstats module.
+"""
+import collections
+import marshal
+import time
+
+from Seawolf import Block, If, Else, ProcDef, nodes
+
+program = "<program>"
+
+class Profiler(object):
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.reset()
+
+    def reset(self):
+        """
+        Forgets what was profiled so far.
+        """
+        # name -> [primitive calls, calls, exclusive time, inclusive time]
+        self.functions = collections.defaultdict(lambda: [0, 0, 0.0, 0.0])
+        # (caller, callee) -> the same, for the calls between them.
+        self.edges = collections.defaultdict(lambda: [0, 0, 0.0, 0.0])
+        # The stacks of calls, by their names joined with ";", and the
+        # exclusive time spent in them.
+        self.stacks = collections.Counter()
+        self.statements = []
+        self.lines = {}
+        self.active = collections.Counter()
+        self.calls = []
+
+    def instrument(self, node):
+        """
+        Makes a resolved program report to the profiler when it runs.
+        """
+        for n in nodes(node):
+            if isinstance(n, Block):
+                for statement in n.statements:
+                    self.count(statement)
+            elif isinstance(n, If):
+                self.count(n.right)
+            elif isinstance(n, Else):
+                self.count(n.right1)
+                self.count(n.right2)
+            if isinstance(n, ProcDef):
+                self.time(n.function, n.line)
+        self.lines.setdefault(program, node.statements[0].line if node.statements else None)
+
+    def count(self, statement):
+        if isinstance(statement, Block):
+            return
+        hits = [0]
+        plain = statement.evaluate
+        def evaluate():
+            hits[0] += 1
+            return plain()
+        statement.evaluate = evaluate
+        self.statements.append((statement, hits))
+
+    def time(self, function, line):
+        name = function.name
+        self.lines.setdefault(name, line)
+        plain = function.body.evaluate
+        def evaluate():
+            self.enter(name)
+            try:
+                return plain()
+            finally:
+                self.leave()
+        function.body.evaluate = evaluate
+
+    def enter(self, name):
+        self.active[name] += 1
+        caller = self.calls[-1][0] if self.calls else program
+        path = (self.calls[-1][3] if self.calls else program) + ";" + name
+        # name, when it started, the time of the calls it made, its stack
+        # and its caller.
+        self.calls.append([name, self.clock(), 0.0, path, caller])
+
+    def leave(self):
+        name, start, children, path, caller = self.calls.pop()
+        elapsed = self.clock() - start
+        self.active[name] -= 1
+        recursive = self.active[name] > 0
+        for stats in (self.functions[name], self.edges[caller, name]):
+            stats[0] += 0 if recursive else 1
+            stats[1] += 1
+            stats[2] += elapsed - children
+            # Time in recursive calls is already in the outermost one.
+            stats[3] += 0.0 if recursive else elapsed
+        self.stacks[path] += elapsed - children
+        if self.calls:
+            self.calls[-1][2] += elapsed
+
+    def run(self, node):
+        """
+        Evaluates an instrumented program, timing it as a whole too.
+        """
+        self.calls.append([program, self.clock(), 0.0, program, None])
+        try:
+            return node.evaluate()
+        finally:
+            name, start, children, path, caller = self.calls.pop()
+            elapsed = self.clock() - start
+            self.functions[program] = [1, 1, elapsed - children, elapsed]
+            self.stacks[program] += elapsed - children
+
+    def report(self):
+        """
+        Returns the functions, by inclusive time, and the statements that
+        ran, by line, as tables.
+        """
+        lines = ["%-20s %10s %12s %12s %12s" % ("function", "calls", "inclusive",
+                                                "exclusive", "per call")]
+        for name, (primitive, calls, exclusive, inclusive) in sorted(
+                self.functions.items(), key=lambda item: -item[1][3]):
+            lines.append("%-20s %10d %12.6f %12.6f %12.6f" % (
+                name, calls, inclusive, exclusive, inclusive / calls))
+        lines.append("")
+        lines.append("%6s %10s  %s" % ("line", "hits", "statement"))
+        for statement, hits in sorted(self.statements, key=lambda s: (s[0].line or 0, -s[1][0])):
+            if hits[0]:
+                lines.append("%6s %10d  %s" % (statement.line, hits[0], type(statement).__name__))
+        return "\n".join(lines) + "\n"
+
+    def collapsed(self):
+        """
+        Returns one line per call stack: the names in it joined with ";"
+        and the microseconds spent in its last function.
+        """
+        return "".join("%s %d\n" % (path, round(seconds * 1e6))
+                       for path, seconds in sorted(self.stacks.items()))
+
+    def dump(self, path, source="<seawolf>"):
+        """
+        Writes the function times to path so that pstats.Stats(path) can
+        read them.
+        """
+        def key(name):
+            return (source, self.lines.get(name) or 0, name)
+        stats = {}
+        for name, (primitive, calls, exclusive, inclusive) in self.functions.items():
+            callers = {}
+            for (caller, callee), edge in self.edges.items():
+                if callee == name:
+                    callers[key(caller)] = tuple(edge)
+            stats[key(name)] = (primitive, calls, exclusive, inclusive, callers)
+        f = open(path, "wb")
+        marshal.dump(stats, f)
+        f.close()
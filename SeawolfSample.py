@@ -0,0 +1,143 @@
+"""
+A sampling profiler for Seawolf.py programs.
+
+A Sampler sets a profiling timer. Each time it fires, the signal handler
+walks the Python frames of the interpreter and turns them into the Seawolf
+call stack they stand for:
+- a Function.run frame is a call of the function in its function local;
+- an evaluate() frame of a statement gives the line that call is at;
+- a SeawolfVM Machine.execute frame holds its calls in callers;
+- a function compiled by SeawolfJIT has a frame of its own.
+Lines are only known in the tree walker. The samples are counted per
+stack, which is all the program pays for between them, so a coarse
+interval keeps the cost well under what tracing every call does.
+"""
+import collections
+import signal
+import sys
+import threading
+
+import Seawolf
+import SeawolfVM
+
+program = "<program>"
+
+class Sampler(object):
+    """
+    Samples the thread running the program (the main thread unless thread
+    is given) every interval seconds of CPU time. Signal handlers can only
+    be set from the main thread, so start() does nothing anywhere else.
+    """
+
+    def __init__(self, interval=0.005, thread=None):
+        self.interval = interval
+        self.thread = thread
+        self.samples = collections.Counter()
+        self.previous = None
+        self.started = False
+
+    def reset(self):
+        """
+        Forgets the samples taken so far.
+        """
+        self.samples.clear()
+
+    def start(self):
+        """
+        Starts sampling, and returns whether it could: not outside the main
+        thread, like in SeawolfServer.
+        """
+        if threading.current_thread() is not threading.main_thread():
+            return False
+        self.previous = signal.signal(signal.SIGPROF, self.sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        self.started = True
+        return True
+
+    def stop(self):
+        if not self.started:
+            return
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, self.previous or signal.SIG_DFL)
+        self.started = False
+
+    def sample(self, signum, frame):
+        if self.thread is not None:
+            frame = sys._current_frames().get(self.thread)
+        self.samples[stack(frame)] += 1
+
+    def report(self, limit=20):
+        """
+        Returns the share of the samples each function was running in
+        (total) and on top of the stack (self), and the most sampled
+        stacks.
+        """
+        count = sum(self.samples.values()) or 1
+        running = collections.Counter()
+        top = collections.Counter()
+        for calls, n in self.samples.items():
+            for name in set(name for name, line in calls):
+                running[name] += n
+            top[calls[-1][0]] += n
+        lines = ["%-20s %10s %8s %8s" % ("function", "samples", "total", "self")]
+        for name, n in running.most_common():
+            lines.append("%-20s %10d %7.1f%% %7.1f%%" % (name, n, 100.0 * n / count,
+                                                       100.0 * top[name] / count))
+        lines.append("")
+        lines.append("%10s  %s" % ("samples", "stack"))
+        for calls, n in self.samples.most_common(limit):
+            lines.append("%10d  %s" % (n, format(calls)))
+        return "\n".join(lines) + "\n"
+
+    def collapsed(self):
+        """
+        Returns one line per sampled stack, in the format flame graph tools
+        read.
+        """
+        return "".join("%s %d\n" % (format(calls), n)
+                       for calls, n in sorted(self.samples.items()))
+
+def format(calls):
+    return ";".join(name if line is None else "%s:%d" % (name, line)
+                    for name, line in calls)
+
+runCodes = (Seawolf.Function.plainRun.__code__, Seawolf.Function.countedRun.__code__,
+            Seawolf.Function.hookedRun.__code__)
+executeCode = SeawolfVM.Machine.execute.__code__
+
+def stack(frame):
+    """
+    Returns the Seawolf calls the Python frames up from frame stand for,
+    outermost first, as (function name, line) pairs.
+    """
+    calls = []
+    line = None
+    # Whether the last call came from a compiled function, whose
+    # Function.run frame is the same call.
+    compiled = False
+    while frame is not None:
+        code = frame.f_code
+        if code in runCodes:
+            # A call that has only just started has no function yet.
+            function = frame.f_locals.get("function", frame.f_locals["self"])
+            if not compiled:
+                calls.append((function.name, line))
+            line = None
+            compiled = False
+        elif code.co_name == "evaluate":
+            if line is None:
+                line = getattr(frame.f_locals.get("self"), "line", None)
+        elif code is executeCode:
+            machine = frame.f_locals
+            names = [c.name for c, pc, locals in machine["callers"]] + [machine["code"].name]
+            # The first is the program itself.
+            for name in reversed(names[1:]):
+                calls.append((name, None))
+        elif code.co_filename.startswith("<seawolf "):
+            calls.append((code.co_name[2:], line))
+            line = None
+            compiled = True
+        frame = frame.f_back
+    calls.append((program, line))
+    calls.reverse()
+    return tuple(calls)
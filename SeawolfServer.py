@@ -0,0 +1,161 @@
+"""
+A daemon running Seawolf programs sent to it over a Unix socket, so that a
+job pays neither for starting Python nor for building the parsers.
+
+A client connects, sends a line of command line options and then the
+program, and closes its side of the connection. The daemon runs the
+program on a warmed Interpreter for those options (of SeawolfBase.py if
+they include --base, of Seawolf.py otherwise), reset first so that the
+program sees nothing of the ones before it, and sends back what the
+program writes to stdout and stderr as it writes it. Options it cannot
+take are reported back the same way, and --profile=FILE and --sample=FILE
+send their report without writing FILE.
+
+Run "python SeawolfServer.py --serve" to start the daemon and
+"python SeawolfServer.py [options] program.txt" to run a program on it.
+Both take --socket=PATH to use another socket than /tmp/seawolf.sock.
+"""
+import asyncio
+import concurrent.futures
+import contextlib
+import socket
+import sys
+import traceback
+
+path = "/tmp/seawolf.sock"
+
+class Stream(object):
+    """
+    A file that passes what is written to it to the event loop, which
+    sends it to the client.
+    """
+
+    def __init__(self, loop, writer):
+        self.loop = loop
+        self.writer = writer
+
+    def write(self, text):
+        self.loop.call_soon_threadsafe(self.writer.write, text.encode())
+        return len(text)
+
+    def flush(self):
+        pass
+
+# The options that write to a file, which the daemon would write as its
+# own user wherever a client asked.
+writing = ("--profile=", "--sample=")
+
+def allowed(options):
+    """
+    Returns options without the files of the options in writing, saying so
+    on stderr. Their reports still go to the client.
+    """
+    result = []
+    for option in options:
+        if option.startswith(writing):
+            flag = option.partition("=")[0]
+            sys.stderr.write("%s is ignored: the daemon writes no files, so %s only reports\n"
+                             % (option, flag))
+            option = flag
+        result.append(option)
+    return result
+
+class Server(object):
+    """
+    Accepts connections on the event loop and runs their programs one at a
+    time on a thread of its own: the interpreters of a language share its
+    module-level state, and the program's output is caught by replacing
+    sys.stdout.
+    """
+
+    def __init__(self, path=path):
+        self.path = path
+        self.interpreters = {}
+        self.executor = concurrent.futures.ThreadPoolExecutor(1)
+
+    def interpreter(self, options):
+        # Imported here so that clients do not build the parsers.
+        import Seawolf
+        import SeawolfBase
+        key = tuple(sorted(options))
+        if key not in self.interpreters:
+            if "--base" in options:
+                self.interpreters[key] = SeawolfBase.configure(options)
+            else:
+                self.interpreters[key] = Seawolf.configure(options)
+        return self.interpreters[key]
+
+    def execute(self, options, source, stream):
+        with contextlib.redirect_stdout(stream), contextlib.redirect_stderr(stream):
+            try:
+                interpreter = self.interpreter(allowed(options))
+                interpreter.reset()
+                interpreter.run(source)
+            except Exception:
+                # What the command line would have died of, bad options
+                # included.
+                traceback.print_exc()
+
+    async def handle(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        try:
+            options = (await reader.readline()).decode().split()
+            source = (await reader.read()).decode()
+            await loop.run_in_executor(self.executor, self.execute, options, source,
+                                       Stream(loop, writer))
+            await writer.drain()
+        finally:
+            writer.close()
+            await writer.wait_closed()
+
+    async def serve(self):
+        # Warm up the interpreters most jobs use.
+        self.interpreter([])
+        self.interpreter(["--base"])
+        server = await asyncio.start_unix_server(self.handle, self.path)
+        async with server:
+            await server.serve_forever()
+
+def send(source, options=(), path=path, output=None):
+    """
+    Runs a program on the daemon listening on path, writing what it prints
+    to output (stdout by default) as it arrives.
+    """
+    output = output or sys.stdout.buffer
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(path)
+        client.sendall((" ".join(options) + "\n" + source).encode())
+        client.shutdown(socket.SHUT_WR)
+        while True:
+            data = client.recv(65536)
+            if not data:
+                break
+            output.write(data)
+            output.flush()
+    finally:
+        client.close()
+
+def main(argv):
+    options = [a for a in argv[1:] if a.startswith("--")]
+    arguments = [a for a in argv[1:] if not a.startswith("--")]
+    socketPath = path
+    for option in options:
+        if option.startswith("--socket="):
+            socketPath = option.partition("=")[2]
+    options = [o for o in options if not o.startswith("--socket=")]
+
+    if "--serve" in options:
+        asyncio.run(Server(socketPath).serve())
+        return
+
+    try:
+        f = open(arguments[0], "r")
+    except(IndexError, IOError):
+        f = open("input1.txt", "r")
+    source = f.read()
+    f.close()
+    send(source, options, socketPath)
+
+if __name__ == "__main__":
+    main(sys.argv)
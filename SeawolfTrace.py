@@ -0,0 +1,122 @@
+"""
+Tracing for SeawolfBase.py programs.
+
+Each trace point names a method of a class, a category and a level, and
+how to describe a call to it. While tracing is off the methods are the
+plain ones, so trace points cost nothing. enable() swaps in versions that
+describe each call to a Sink before making it, for the points in the
+categories asked for and at or below the level asked for; disable() puts
+the plain methods back. Code switching a traced method to another version
+of it does so with swap(), which keeps the trace on the new version.
+
+The categories SeawolfBase uses are "parse" for the nodes the parser
+builds, "eval" for evaluating them and "variables" for the reads and
+writes of the variable map.
+"""
+import atexit
+import sys
+
+INFO = 1
+DEBUG = 2
+
+levels = {"info": INFO, "debug": DEBUG}
+
+categories = ("parse", "eval", "variables")
+
+class Sink(object):
+    """
+    Collects trace lines and writes them to stream size lines at a time,
+    and when flushed.
+    """
+
+    def __init__(self, stream=None, size=1000):
+        self.stream = stream
+        self.size = size
+        self.lines = []
+
+    def write(self, category, parts):
+        self.lines.append("[%s] %s" % (category, " ".join(str(p) for p in parts)))
+        if len(self.lines) >= self.size:
+            self.flush()
+
+    def flush(self):
+        if self.lines:
+            stream = self.stream or sys.stderr
+            stream.write("\n".join(self.lines) + "\n")
+            stream.flush()
+            self.lines = []
+
+class Point(object):
+
+    def __init__(self, category, level, cls, method, describe):
+        self.category = category
+        self.level = level
+        self.cls = cls
+        self.method = method
+        self.describe = describe
+        self.plain = None
+
+    def install(self, sink):
+        plain = self.plain = self.cls.__dict__[self.method]
+        category = self.category
+        describe = self.describe
+        def traced(node, *args):
+            sink.write(category, describe(node, *args))
+            return plain(node, *args)
+        setattr(self.cls, self.method, traced)
+
+    def remove(self):
+        setattr(self.cls, self.method, self.plain)
+        self.plain = None
+
+points = []
+sink = None
+
+def point(category, level, cls, method, describe):
+    """
+    Registers a trace point. describe gets the arguments of the method and
+    returns the parts of the line to trace, which are joined by spaces.
+    """
+    points.append(Point(category, level, cls, method, describe))
+
+def enable(names=categories, level=DEBUG, stream=None):
+    """
+    Traces the points in the categories in names up to level, to stream
+    (stderr by default).
+    """
+    global sink
+    disable()
+    for name in names:
+        if name not in categories:
+            raise KeyError(name)
+    sink = Sink(stream)
+    for p in points:
+        if p.category in names and p.level <= level:
+            p.install(sink)
+
+def swap(cls, method, function):
+    """
+    Makes function the method of cls, traced if that method is.
+    """
+    setattr(cls, method, function)
+    for p in points:
+        if p.cls is cls and p.method == method and p.plain is not None:
+            p.install(sink)
+
+def disable():
+    """
+    Puts the plain methods back and writes out what was traced.
+    """
+    global sink
+    for p in reversed(points):
+        if p.plain is not None:
+            p.remove()
+    if sink is not None:
+        sink.flush()
+        sink = None
+
+def flush():
+    if sink is not None:
+        sink.flush()
+
+atexit.register(flush)
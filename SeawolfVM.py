@@ -0,0 +1,386 @@
+"""
+A bytecode compiler and stack machine for Seawolf programs.
+
+The Compiler lowers the tree built by Seawolf.Parser into flat lists of
+(opcode, argument) instructions, one list per function plus one for the
+top level program. The Machine then runs them in a single loop instead of
+calling evaluate() on every node.
+
+Run "python SeawolfVM.py program.txt" to time both evaluators on a program.
+"""
+import contextlib
+import io
+import sys
+import time
+
+import Seawolf
+from Seawolf import (IntLiteral, Variable, Assign, Print, Operation, Compare,
+                     Block, Return, If, Else, ProcDef, ProcedureCall)
+
+# Opcodes. The machine tests them in this order, so the most frequent ones
+# come first. The *_CONST forms take their right operand from the
+# instruction instead of the stack; they cover "n - 1" and "m == 0", which
+# make up most of the arithmetic in recursive functions.
+LOAD_FAST = 0
+CONST = 1
+SUBTRACT_CONST = 2
+EQUAL_CONST = 3
+JUMP_IF_FALSE = 4
+CALL = 5
+RETURN = 6
+TAIL_CALL = 7
+ADD_CONST = 8
+LESS_CONST = 9
+LOAD = 10
+ADD = 11
+SUBTRACT = 12
+MULTIPLY = 13
+MODULO = 14
+LESS = 15
+EQUAL = 16
+STORE = 17
+JUMP = 18
+POP = 19
+PRINT = 20
+DEFINE = 21
+
+opnames = ["LOAD_FAST", "CONST", "SUBTRACT_CONST", "EQUAL_CONST",
+           "JUMP_IF_FALSE", "CALL", "RETURN", "TAIL_CALL", "ADD_CONST",
+           "LESS_CONST", "LOAD", "ADD", "SUBTRACT", "MULTIPLY", "MODULO",
+           "LESS", "EQUAL", "STORE", "JUMP", "POP", "PRINT", "DEFINE"]
+
+operations = {
+    '*': MULTIPLY,
+    '+': ADD,
+    '-': SUBTRACT,
+    '%': MODULO,
+    '<': LESS,
+    '==': EQUAL
+}
+
+constOperations = {
+    '+': ADD_CONST,
+    '-': SUBTRACT_CONST,
+    '<': LESS_CONST,
+    '==': EQUAL_CONST
+}
+
+class Code(object):
+    """
+    The instructions of a function body or of the top level program.
+    """
+
+    def __init__(self, name, params):
+        self.name = name
+        self.params = params
+        self.instructions = []
+
+    def emit(self, opcode, argument=None):
+        self.instructions.append((opcode, argument))
+        return len(self.instructions) - 1
+
+    def patch(self, index):
+        """
+        Points the jump emitted at index to the next instruction.
+        """
+        self.instructions[index] = (self.instructions[index][0],
+                                    len(self.instructions))
+
+    def dump(self):
+        lines = []
+        for i, (opcode, argument) in enumerate(self.instructions):
+            if isinstance(argument, Code):
+                argument = argument.name
+            lines.append("%4d %-14s %r" % (i, opnames[opcode], argument))
+        return "\n".join(lines)
+
+class Compiler(object):
+    """
+    Lowers a parsed Block into a Code object.
+    """
+
+    def __init__(self):
+        self.statements = {
+            Block: self.block,
+            Assign: self.assign,
+            Print: self.print_,
+            Return: self.return_,
+            If: self.if_,
+            Else: self.else_,
+            ProcDef: self.procDef
+        }
+        self.expressions = {
+            IntLiteral: self.intLiteral,
+            Variable: self.variable,
+            Operation: self.operation,
+            Compare: self.operation,
+            ProcedureCall: self.procedureCall
+        }
+
+    def compile(self, node, name="<program>", params=()):
+        code = Code(name, list(params))
+        self.statement(node, code)
+        code.emit(CONST, None)
+        code.emit(RETURN)
+        return code
+
+    def statement(self, node, code):
+        if type(node) in self.statements:
+            self.statements[type(node)](node, code)
+        else:
+            # A bare procedure call; its value is thrown away.
+            self.expression(node, code)
+            code.emit(POP)
+
+    def expression(self, node, code):
+        self.expressions[type(node)](node, code)
+
+    def block(self, node, code):
+        for statement in node.statements:
+            self.statement(statement, code)
+
+    def assign(self, node, code):
+        self.expression(node.right, code)
+        code.emit(STORE, node.left.value)
+
+    def print_(self, node, code):
+        self.expression(node.value, code)
+        code.emit(PRINT)
+
+    def return_(self, node, code):
+        # Seawolf.resolve marks the calls in tail position.
+        if isinstance(node.value, ProcedureCall) and node.value.tail:
+            for param in node.value.param:
+                self.expression(param, code)
+            code.emit(TAIL_CALL, (node.value.left.value, len(node.value.param)))
+            return
+        self.expression(node.value, code)
+        code.emit(RETURN)
+
+    def if_(self, node, code):
+        self.expression(node.left, code)
+        jump = code.emit(JUMP_IF_FALSE)
+        self.statement(node.right, code)
+        code.patch(jump)
+
+    def else_(self, node, code):
+        self.expression(node.left, code)
+        jump = code.emit(JUMP_IF_FALSE)
+        self.statement(node.right1, code)
+        skip = code.emit(JUMP)
+        code.patch(jump)
+        self.statement(node.right2, code)
+        code.patch(skip)
+
+    def procDef(self, node, code):
+        params = [p.value for p in node.param]
+        code.emit(DEFINE, self.compile(node.right, node.left.value, params))
+
+    def intLiteral(self, node, code):
+        code.emit(CONST, node.value)
+
+    def variable(self, node, code):
+        # Parameters are always bound in the frame; anything else may still
+        # have to fall back to the globals.
+        if node.value in code.params:
+            code.emit(LOAD_FAST, node.value)
+        else:
+            code.emit(LOAD, node.value)
+
+    def operation(self, node, code):
+        self.expression(node.left, code)
+        if isinstance(node.right, IntLiteral) and node.operate in constOperations:
+            code.emit(constOperations[node.operate], node.right.value)
+        else:
+            self.expression(node.right, code)
+            code.emit(operations[node.operate])
+
+    def procedureCall(self, node, code):
+        for param in node.param:
+            self.expression(param, code)
+        code.emit(CALL, (node.left.value, len(node.param)))
+
+class Machine(object):
+    """
+    Runs compiled code. Holds the global variables and the functions
+    defined so far, like Seawolf.stack and Seawolf.functionMap do for the
+    tree walker.
+    """
+
+    def __init__(self, budget=None):
+        self.globalMap = {}
+        self.functionMap = {}
+        # A SeawolfBudget.Budget to count the calls against.
+        self.budget = budget
+
+    def run(self, code):
+        return self.execute(code, self.globalMap)
+
+    def execute(self, code, frame):
+        """
+        Runs code to its final RETURN. Calls do not recurse into execute():
+        the caller's code, position and frame go on the callers list, so
+        Seawolf recursion is only bounded by memory. All calls share one
+        operand stack; a call's arguments are on top of it when it starts
+        and its result is when it returns.
+        """
+        instructions = code.instructions
+        globalMap = self.globalMap
+        functionMap = self.functionMap
+        tick = self.budget.tick if self.budget is not None else None
+        callers = []
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        pc = 0
+        while True:
+            opcode, argument = instructions[pc]
+            pc += 1
+            if opcode == LOAD_FAST:
+                push(frame[argument])
+            elif opcode == CONST:
+                push(argument)
+            elif opcode == SUBTRACT_CONST:
+                stack[-1] -= argument
+            elif opcode == EQUAL_CONST:
+                stack[-1] = 1 if stack[-1] == argument else 0
+            elif opcode == JUMP_IF_FALSE:
+                if not pop():
+                    pc = argument
+            elif opcode == CALL:
+                if tick is not None:
+                    tick()
+                name, count = argument
+                function = functionMap[name]
+                if count != len(function.params):
+                    raise Seawolf.SemanticError()
+                if count:
+                    args = stack[-count:]
+                    del stack[-count:]
+                else:
+                    args = ()
+                callers.append((code, pc, frame))
+                code = function
+                instructions = function.instructions
+                pc = 0
+                frame = dict(zip(function.params, args))
+            elif opcode == RETURN:
+                # The result stays on the stack for the caller.
+                if not callers:
+                    return pop()
+                code, pc, frame = callers.pop()
+                instructions = code.instructions
+            elif opcode == TAIL_CALL:
+                # Carry on with the called function in this same loop,
+                # reusing the frame when it calls itself.
+                if tick is not None:
+                    tick()
+                name, count = argument
+                function = functionMap[name]
+                if count != len(function.params):
+                    raise Seawolf.SemanticError()
+                if count:
+                    args = stack[-count:]
+                    del stack[-count:]
+                else:
+                    args = ()
+                if function is code:
+                    frame.clear()
+                    frame.update(zip(function.params, args))
+                else:
+                    frame = dict(zip(function.params, args))
+                code = function
+                instructions = function.instructions
+                pc = 0
+            elif opcode == ADD_CONST:
+                stack[-1] += argument
+            elif opcode == LESS_CONST:
+                stack[-1] = 1 if stack[-1] < argument else 0
+            elif opcode == LOAD:
+                if argument in frame:
+                    push(frame[argument])
+                else:
+                    push(globalMap[argument])
+            elif opcode == ADD:
+                right = pop()
+                stack[-1] += right
+            elif opcode == SUBTRACT:
+                right = pop()
+                stack[-1] -= right
+            elif opcode == MULTIPLY:
+                right = pop()
+                stack[-1] *= right
+            elif opcode == MODULO:
+                right = pop()
+                stack[-1] %= right
+            elif opcode == LESS:
+                right = pop()
+                stack[-1] = 1 if stack[-1] < right else 0
+            elif opcode == EQUAL:
+                right = pop()
+                stack[-1] = 1 if stack[-1] == right else 0
+            elif opcode == STORE:
+                frame[argument] = pop()
+            elif opcode == JUMP:
+                pc = argument
+            elif opcode == POP:
+                pop()
+            elif opcode == PRINT:
+                print(pop())
+            elif opcode == DEFINE:
+                functionMap[argument.name] = argument
+
+def run(node):
+    """
+    Compiles a parsed and resolved program and runs it on a fresh Machine.
+    """
+    return Machine().run(Compiler().compile(node))
+
+def measure(source, repeat=5):
+    """
+    Times the tree walker and the machine on a program, leaving parsing
+    out. Returns the best (tree, vm) times in seconds.
+    """
+    def walk():
+        Seawolf.reset()
+        node = Seawolf.parse(source)
+        Seawolf.resolve(node)
+        start = time.perf_counter()
+        node.evaluate()
+        return time.perf_counter() - start
+
+    def machine():
+        node = Seawolf.parse(source)
+        Seawolf.resolve(node)
+        start = time.perf_counter()
+        run(node)
+        return time.perf_counter() - start
+
+    times = []
+    for evaluate in (walk, machine):
+        best = None
+        output = io.StringIO()
+        for i in range(repeat):
+            output.seek(0)
+            output.truncate()
+            with contextlib.redirect_stdout(output):
+                elapsed = evaluate()
+            if best is None or elapsed < best:
+                best = elapsed
+        times.append((best, output.getvalue()))
+    if times[0][1] != times[1][1]:
+        raise AssertionError("the evaluators printed different output")
+    return times[0][0], times[1][0]
+
+if __name__ == "__main__":
+    try:
+        f = open(sys.argv[1], "r")
+    except(IndexError, IOError):
+        f = open("input1.txt", "r")
+    source = f.read()
+    f.close()
+
+    tree, vm = measure(source)
+    print("tree: %.6fs" % tree)
+    print("vm:   %.6fs" % vm)
+    print("speedup: %.2fx" % (tree / vm))
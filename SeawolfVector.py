@@ -0,0 +1,142 @@
+"""
+Element-wise arithmetic and comparisons on the lists of SeawolfBase.py.
+
+An arithmetic operator, or a comparison, with a list on one side works on
+its elements: two lists element by element, which takes them to be as
+long as each other, and a list and a number by applying the number to
+every element. The elements must be numbers. == and != between two lists
+still compare the lists as a whole. The result is a new list, of 1 and 0
+for the comparisons, packed like a list literal would be.
+
+Long lists are worked on as NumPy arrays if NumPy is installed, straight
+from the memory of a Packed list. Short lists, ints big enough to overflow
+NumPy's, ** and everything when NumPy is not there go through a loop in
+Python instead, which gives the same results.
+"""
+import array as arrays
+import operator
+
+from SeawolfBase import SemanticError, Packed, pack, sequences
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Lists shorter than this cost more to convert to arrays and back than
+# NumPy saves on them.
+threshold = 32
+
+# Ints are left to Python from this size on: below it, the results of
+# every operation but ** fit in NumPy's 64 bits, and the ints convert to
+# floats exactly.
+limit = 2 ** 31
+
+numbers = (int, float)
+# What the values of a Packed can be.
+vectors = (list, arrays.array)
+
+# The NumPy function of each operation, by which SeawolfBase.py names it,
+# and what it does on two numbers. ** is left out of NumPy, which gives
+# nan where Python gives a complex number.
+operations = {
+    "add": operator.add,
+    "subtract": operator.sub,
+    "multiply": operator.mul,
+    "true_divide": operator.truediv,
+    "floor_divide": operator.floordiv,
+    "remainder": operator.mod,
+    "power": operator.pow,
+    "equal": lambda left, right: 1 if left == right else 0,
+    "not_equal": lambda left, right: 1 if left != right else 0,
+    "less": lambda left, right: 1 if left < right else 0,
+    "less_equal": lambda left, right: 1 if left <= right else 0,
+    "greater": lambda left, right: 1 if left > right else 0,
+    "greater_equal": lambda left, right: 1 if left >= right else 0
+}
+divisions = ("true_divide", "floor_divide", "remainder")
+comparisons = ("equal", "not_equal", "less", "less_equal", "greater", "greater_equal")
+
+def apply(name, left, right):
+    """
+    Applies the operation name to left and right, one of them at least a
+    list.
+    """
+    length = None
+    for operand in (left, right):
+        if type(operand) in sequences:
+            if length is not None and len(operand) != length:
+                raise SemanticError()
+            length = len(operand)
+        elif type(operand) not in numbers:
+            raise SemanticError()
+    if numpy is not None and length >= threshold and name != "power":
+        result = vectorized(name, left, right)
+        if result is not None:
+            return result
+    return loop(name, left, right)
+
+def loop(name, left, right):
+    if type(left) is Packed:
+        left = left.values
+    if type(right) is Packed:
+        right = right.values
+    # The elements of an array are numbers already.
+    for operand in (left, right):
+        if type(operand) is list:
+            for value in operand:
+                if type(value) not in numbers:
+                    raise SemanticError()
+    if name in divisions and (0 in right if type(right) in vectors else right == 0):
+        raise SemanticError()
+    function = operations[name]
+    if type(left) not in vectors:
+        return pack([function(left, value) for value in right])
+    if type(right) not in vectors:
+        return pack([function(value, right) for value in left])
+    return pack([function(a, b) for a, b in zip(left, right)])
+
+def array(operand):
+    """
+    Returns operand as something NumPy works on exactly as Python would,
+    or None if it cannot.
+    """
+    if type(operand) not in sequences:
+        if type(operand) is int and not -limit < operand < limit:
+            return None
+        return operand
+    if type(operand) is Packed:
+        operand = operand.values
+    if type(operand) is list:
+        # NumPy would make the ints of a list of ints and floats floats.
+        if len(set(map(type, operand))) > 1:
+            return None
+        values = numpy.array(operand)
+    elif operand.typecode == "q":
+        values = numpy.frombuffer(operand, numpy.int64)
+    else:
+        values = numpy.frombuffer(operand, numpy.float64)
+    if values.dtype.kind == "f":
+        return values
+    if values.dtype.kind == "i" and (len(values) == 0 or -limit < values.min() and values.max() < limit):
+        return values
+    # Big ints, or something other than numbers.
+    return None
+
+def vectorized(name, left, right):
+    """
+    Applies the operation name with NumPy, or returns None if NumPy would
+    not give the result Python does.
+    """
+    left = array(left)
+    right = array(right)
+    if left is None or right is None:
+        return None
+    if name in divisions and not numpy.all(right):
+        raise SemanticError()
+    result = getattr(numpy, name)(left, right)
+    if name in comparisons:
+        result = result.astype(numpy.int64)
+    if result.dtype == numpy.int64:
+        return Packed(arrays.array("q", result.tobytes()))
+    return Packed(arrays.array("d", result.astype(numpy.float64).tobytes()))
@@ -428,15 +428,10 @@ class Parser(tpg.Parser):
 parse = Parser()
 # This is the driver code, that reads in lines, deals with errors, and
 # prints the output if no error occurs.
-
-# Open the file containing the input.
-try:
-    f = open(sys.argv[1], "r")
-except(IndexError, IOError):
-    f = open("input1.txt", "r")
-
-# For each line in f
-for l in f:
+def run(l):
+    """
+    Evaluates one line, printing the result or the error.
+    """
     try:
         # Try to parse the expression.
         node = parse(l)
@@ -460,4 +455,18 @@ for l in f:
         # displaying where it occurs. Comment it for submission.
         # raise
 
-f.close()
+def main(argv):
+    # Open the file containing the input.
+    try:
+        f = open(argv[1], "r")
+    except(IndexError, IOError):
+        f = open("input1.txt", "r")
+
+    # For each line in f
+    for l in f:
+        run(l)
+
+    f.close()
+
+if __name__ == "__main__":
+    main(sys.argv)
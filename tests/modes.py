@@ -0,0 +1,56 @@
+"""
+What the tests of Seawolf.py and SeawolfBase.py share: running a program
+on an interpreter set up by command line options, and checking that each
+mode of the interpreter prints what the plain one does.
+"""
+import contextlib
+import io
+import unittest
+
+class ModesTestCase(unittest.TestCase):
+    """
+    language is the module of the interpreter, with its configure() and
+    parse(), modes the options of each mode compared with the plain
+    interpreter and optimizer a function returning the PassManager of its
+    optimizer.
+    """
+
+    language = None
+    modes = ()
+    optimizer = None
+
+    def output(self, options, source):
+        """
+        Runs source on an interpreter set up by options. Returns what it
+        printed, and the type of the exception it died of or None.
+        """
+        output = io.StringIO()
+        error = None
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(io.StringIO()):
+            try:
+                self.language.configure(options).run(source)
+            except Exception as e:
+                error = type(e)
+        return output.getvalue(), error
+
+    def changes(self, source):
+        """
+        Returns what the passes of the optimizer changed in source, by pass
+        and change.
+        """
+        optimizer = self.optimizer()
+        optimizer.run(self.language.parse(source))
+        return dict(((p.name, change), count) for p in optimizer.passes
+                    for change, count in p.stats.items())
+
+    def assertModesAgree(self, source, expected=None):
+        """
+        Checks that every mode prints what the plain interpreter does, and
+        that it prints expected if it is given.
+        """
+        plain = self.output([], source)
+        if expected is not None:
+            self.assertEqual(plain, (expected, None))
+        for options in self.modes:
+            with self.subTest(options=options):
+                self.assertEqual(self.output(options, source), plain)
@@ -0,0 +1,414 @@
+"""
+Runs SeawolfBase.py programs with type inference and each optimization
+pass, and checks that they print what the plain interpreter does.
+
+Run "python -m unittest discover tests" from the top of the package.
+"""
+import contextlib
+import io
+import unittest
+
+import SeawolfBase
+import SeawolfVector
+from modes import ModesTestCase
+
+def printed(*values):
+    return "".join("Console print:  %s\n" % value for value in values)
+
+class BaseTestCase(ModesTestCase):
+
+    language = SeawolfBase
+    modes = (["--infer"], ["--optimize"], ["--optimize", "--infer"], ["--optimize=fold"],
+             ["--optimize=dce"], ["--optimize=strength"], ["--optimize=cse"], ["--optimize=licm"],
+             ["--optimize=cse,licm", "--infer"])
+    optimizer = staticmethod(SeawolfBase.optimizer)
+
+class InferenceTestCase(BaseTestCase):
+
+    def test_loop_widens_to_float(self):
+        self.assertModesAgree("""{
+            x = 1; i = 0;
+            while i < 3 { x = x + 0.5; i = i + 1; }
+            print x * 2; print x + 1;
+        }""", printed(5.0, 3.5))
+
+    def test_branches_of_different_types(self):
+        self.assertModesAgree("""{
+            i = 1;
+            if i { x = 1; } else { x = "s"; }
+            print x + 1;
+        }""", printed(2))
+
+    def test_dead_branch_with_a_type_error(self):
+        source = """{
+            x = 1;
+            if 0 { y = "a" - 1; }
+            print x + 1;
+        }"""
+        self.assertModesAgree(source, printed(2))
+        self.assertEqual(len(SeawolfBase.infer(SeawolfBase.parse(source))), 1)
+
+    def test_type_error_after_output(self):
+        self.assertModesAgree("""{
+            x = 1; print x;
+            y = x / "a";
+            print 2;
+        }""", printed(1) + "SEMANTIC ERROR\n")
+
+    def test_proven_division_by_zero(self):
+        source = "{ x = 4; y = 0; print x + y; print x / y; }"
+        program = SeawolfBase.parse(source)
+        SeawolfBase.infer(program)
+        self.assertEqual(type(program.block[3].value).__name__, "ProvenIntDivide")
+        self.assertModesAgree(source, printed(4) + "SEMANTIC ERROR\n")
+
+    def test_proven_strings(self):
+        self.assertModesAgree("""{
+            a = "ab"; b = "c";
+            print a + b; print (a + b) + a;
+        }""", printed("abc", "abcab"))
+
+class OptimizerTestCase(BaseTestCase):
+
+    def test_folding(self):
+        source = """{
+            print 2 + 3 * 4; print "a" + "b"; print 7 / 2; print 2 ** 10;
+            print 1 + 2.5; print 10 % 3;
+        }"""
+        self.assertEqual(self.changes(source)["fold", "operations"], 7)
+        self.assertModesAgree(source, printed(14, "ab", 3.5, 1024, 3.5, 1))
+
+    def test_failing_operation_left_to_run(self):
+        self.assertModesAgree("""{
+            print 1; print 1 / 0;
+        }""", printed(1) + "SEMANTIC ERROR\n")
+        self.assertModesAgree("""{
+            print 1; print "ab" * 3;
+        }""", printed(1) + "SEMANTIC ERROR\n")
+
+    def test_dead_code(self):
+        source = """{
+            if 0 { print 1 / 0; } else { print 1; }
+            while 0 { print 2; }
+            print 3;
+        }"""
+        self.assertIn(("dce", "branches"), self.changes(source))
+        self.assertIn(("dce", "loops"), self.changes(source))
+        self.assertModesAgree(source, printed(1, 3))
+
+    def test_strength_reduction(self):
+        source = """{
+            x = 3; y = 2.5;
+            print x ** 2; print x ** 1; print y / 4; print y ** 2;
+            print x + 0; print x * 1; print x - 0;
+        }"""
+        found = self.changes(source)
+        # y ** 2 is left, y being a float.
+        self.assertEqual(found["strength", "powers"], 2)
+        self.assertEqual(found["strength", "divisions"], 1)
+        self.assertEqual(found["strength", "identities"], 3)
+        self.assertModesAgree(source, printed(9, 3, 0.625, 6.25, 3, 3, 3))
+
+    def test_float_square_that_overflows(self):
+        # y * y would be inf.
+        source = "{ y = %d.0; print 1; print y ** 2; }" % 10 ** 200
+        self.assertNotIn(("strength", "powers"), self.changes(source))
+        self.assertEqual(self.output(["--optimize=strength"], source),
+                         (printed(1), OverflowError))
+        self.assertModesAgree(source)
+
+    def test_strength_reduction_on_unknown_types(self):
+        # x may be a string, whose - 0 is a semantic error.
+        self.assertModesAgree("""{
+            i = 0;
+            if i { x = 1; } else { x = "s"; }
+            print x - 0;
+        }""")
+
+    def test_huge_power_left_to_run(self):
+        self.assertModesAgree("""{
+            x = 0;
+            if x { print 9 ** 9 ** 9; }
+            print 2 ** 10; print (0 - 3) ** 3; print 2 ** (0 - 1);
+        }""", printed(1024, -27, 0.5))
+
+    def test_huge_results_left_to_run(self):
+        source = """{
+            if 0 == 1 { print 300000000 * "ab"; print "ab" * 300000000; }
+            print 3 * "ab"; print 2 ** 3000 * 2 ** 3000 > 0; print "%s" + "%s" == "";
+        }""" % ("a" * 3000, "b" * 3000)
+        # 0 == 1, 3 * "ab" and both 2 ** 3000.
+        self.assertEqual(self.changes(source)["fold", "operations"], 4)
+        self.assertModesAgree(source, printed("ababab", 1, 0))
+
+class SharingTestCase(BaseTestCase):
+
+    def assertChanged(self, source, change, count):
+        self.assertEqual(self.changes(source).get(change, 0), count)
+
+    def test_repeated_expression(self):
+        source = """{
+            a = 3; b = 4;
+            print (a * b + 1) * (a * b + 1);
+            a = a * a + a * a; print a;
+        }"""
+        self.assertChanged(source, ("cse", "reused"), 2)
+        self.assertModesAgree(source, printed(169, 18))
+
+    def test_list_literals_not_shared(self):
+        source = "{ a = [[1, 2], [1, 2]]; a[0][0] = 9; print a; }"
+        self.assertChanged(source, ("cse", "reused"), 0)
+        self.assertModesAgree(source, printed([[9, 2], [1, 2]]))
+
+    def test_list_assigned_into_not_shared(self):
+        source = """{
+            a = [[1, 2], [3, 4]]; a[0][0] = a[0][1]; print a;
+            b = [[1, 2], [3, 4]]; b[0][b[0][0]] = b[0][0] * 7; print b;
+        }"""
+        self.assertChanged(source, ("cse", "reused"), 1)
+        self.assertModesAgree(source, printed([[2, 2], [3, 4]], [[1, 7], [3, 4]]))
+
+    def test_shared_list_copied(self):
+        self.assertModesAgree("""{
+            a = [1, 2];
+            c = (a * 1) == (a * 1); print c;
+        }""", printed(1))
+
+    def test_invariant_hoisted(self):
+        source = """{
+            a = [1, 2, 3]; i = 0; s = 0;
+            while i < 3 { s = s + a[1] * 2; i = i + 1; }
+            print s;
+        }"""
+        self.assertChanged(source, ("licm", "expressions"), 1)
+        self.assertModesAgree(source, printed(12))
+
+    def test_aliased_list_written_in_loop(self):
+        # b is a, so a[1] changes in the loop although a is never assigned.
+        source = """{
+            a = [1, 2, 3]; b = a; i = 0; s = 0;
+            while i < 3 { s = s + a[1] * 2; b[1] = b[1] + i; i = i + 1; }
+            print s; print a;
+        }"""
+        self.assertChanged(source, ("licm", "expressions"), 0)
+        self.assertModesAgree(source, printed(14, [1, 5, 3]))
+
+    def test_aliased_list_written_in_outer_loop(self):
+        source = """{
+            a = [1, 2]; b = a; i = 0;
+            while i < 2 {
+                j = 0;
+                while j < 2 { print a[0] * 1; j = j + 1; }
+                b[0] = b[0] + 1; i = i + 1;
+            }
+        }"""
+        self.assertChanged(source, ("licm", "moved out"), 0)
+        self.assertModesAgree(source, printed(1, 1, 2, 2))
+
+    def test_list_compared_in_loop_writing_it(self):
+        source = """{
+            a = [1, 2]; b = [10, 2]; c = a; i = 0;
+            while i < 2 { print a == b; print b != c; c[0] = 10; i = i + 1; }
+        }"""
+        self.assertChanged(source, ("licm", "expressions"), 0)
+        self.assertModesAgree(source, printed(0, 1, 1, 0))
+
+    def test_elementwise_operation_in_loop_writing_it(self):
+        source = """{
+            a = [10, 2, 3]; b = a; i = 1;
+            while i < 4 { print a + 1; print (b < 5) * 2; if i < 3 { b[i] = 10; } i = i + 1; }
+        }"""
+        self.assertChanged(source, ("licm", "expressions"), 0)
+        self.assertModesAgree(source, printed([11, 3, 4], [0, 2, 2], [11, 11, 4], [0, 0, 2],
+                                              [11, 11, 11], [0, 0, 0]))
+
+    def test_numbers_hoisted_from_loop_writing_a_list(self):
+        source = """{
+            a = [0, 0, 0]; n = 4; s = "x"; i = 0;
+            while i < 3 { a[i] = n * n + 1; print s + s; i = i + 1; }
+            print a;
+        }"""
+        self.assertChanged(source, ("licm", "expressions"), 2)
+        self.assertModesAgree(source, printed("xx", "xx", "xx", [17, 17, 17]))
+
+    def test_hoisted_list_copied(self):
+        self.assertModesAgree("""{
+            a = [1, 2]; i = 0;
+            while i < 2 { c = a * 1; c[0] = c[0] + 7; print c; i = i + 1; }
+            print a;
+        }""", printed([8, 2], [8, 2], [1, 2]))
+
+    def test_invariant_that_fails(self):
+        source = """{
+            i = 0; n = 0;
+            while i < 3 { print i; if i == 2 { x = n / 0; } i = i + 1; }
+            print 9;
+        }"""
+        self.assertChanged(source, ("licm", "expressions"), 1)
+        self.assertModesAgree(source, printed(0, 1, 2) + "SEMANTIC ERROR\n")
+
+    def test_invariant_never_reached(self):
+        self.assertModesAgree("""{
+            i = 0;
+            while i < 3 { if i > 5 { print 1 / 0; } i = i + 1; }
+            print i;
+        }""", printed(3))
+
+    def test_nested_loops(self):
+        self.assertModesAgree("""{
+            i = 0; t = 0;
+            while i < 3 {
+                j = 0;
+                while j < 2 { t = t + (i * 10) + (5 * 5); j = j + 1; }
+                i = i + 1;
+            }
+            print t;
+        }""", printed(210))
+
+class ElementwiseTestCase(BaseTestCase):
+
+    def test_operations(self):
+        self.assertModesAgree("""{
+            a = [1, 2, 3]; b = [4, 5, 6];
+            print a + b; print a * 2; print 10 - a; print b / 2; print b % a;
+            print a ** 2; print a < 2; print 2 >= a; print [0.5, 1] * 2;
+        }""", printed([5, 7, 9], [2, 4, 6], [9, 8, 7], [2.0, 2.5, 3.0], [0, 1, 0],
+                      [1, 4, 9], [1, 0, 0], [1, 1, 0], [1.0, 2]))
+
+    def test_lists_compared_whole(self):
+        self.assertModesAgree("""{
+            a = [1, 2, 3];
+            print a == [4, 5, 6]; print a == [1, 2, 3]; print a != [1, 0, 3];
+        }""", printed(0, 1, 1))
+
+    def test_semantic_errors(self):
+        for expression in ("[1, 2] + [1, 2, 3]", "[1, 2] < [1]", "[1, \"a\"] + 1",
+                           "\"a\" + [1]", "[[1], [2]] * 2", "[1, 2] / [1, 0]", "[1, 2] % 0"):
+            with self.subTest(expression=expression):
+                self.assertModesAgree("{ print 1; print %s; print 2; }" % expression,
+                                      printed(1) + "SEMANTIC ERROR\n")
+
+class PackedTestCase(BaseTestCase):
+
+    def test_packed(self):
+        self.assertIs(type(SeawolfBase.pack([1, 2])), SeawolfBase.Packed)
+        self.assertIs(type(SeawolfBase.pack([1.5, 2.5])), SeawolfBase.Packed)
+        for values in ([1, 2.5], [1, "a"], [2 ** 70, 1], []):
+            with self.subTest(values=values):
+                self.assertIs(SeawolfBase.pack(values), values)
+
+    def test_writes_of_the_same_type_stay_packed(self):
+        packed = SeawolfBase.pack([1, 2])
+        packed.set(0, 7)
+        self.assertEqual(packed.values.typecode, "q")
+        self.assertEqual(packed, [7, 2])
+
+    def test_writes_through_an_alias(self):
+        # Each write turns the array into a list in place, which the other
+        # variable sees.
+        self.assertModesAgree("""{
+            a = [1, 2, 3]; b = a; b[0] = "x"; print a;
+            c = [1.5, 2.5]; d = c; d[0] = 3; print c;
+            e = [1, 2]; f = e; f[1] = 0.5; print e;
+            g = [1, 2]; h = g; h[0] = 2 ** 70; print g; print g + 1;
+            k = [1, 2]; l = k; l[0] = 7; print k;
+        }""", printed(["x", 2, 3], [3, 2.5], [1, 0.5], [2 ** 70, 2], [2 ** 70 + 1, 3], [7, 2]))
+
+@unittest.skipIf(SeawolfVector.numpy is None, "NumPy is not installed")
+class NumPyTestCase(unittest.TestCase):
+
+    def outcome(self, function, name, left, right):
+        try:
+            result = function(name, left, right)
+        except SeawolfBase.SemanticError:
+            return SeawolfBase.SemanticError
+        if result is None:
+            return None
+        return list(result), [type(value) for value in result]
+
+    def operand(self, random, length):
+        kind = random.choice(("int", "float", "mixed", "big", "scalar"))
+        if kind == "scalar":
+            return random.choice((random.randint(-5, 5), random.uniform(-5, 5), 2 ** 40))
+        values = [random.randint(-9, 9) for i in range(length)]
+        if kind == "float":
+            values = [random.uniform(-9, 9) for value in values]
+        elif kind == "mixed":
+            values[0] = 0.5
+        elif kind == "big":
+            values[0] = 2 ** 40
+        return random.choice((SeawolfBase.pack, list))(values)
+
+    def test_same_results_as_the_loop(self):
+        import random
+        random = random.Random(25)
+        names = [name for name in SeawolfVector.operations if name != "power"]
+        vectorized = 0
+        for case in range(2000):
+            length = random.randint(SeawolfVector.threshold, 2 * SeawolfVector.threshold)
+            name = random.choice(names)
+            left = self.operand(random, length)
+            right = self.operand(random, length)
+            if type(left) not in SeawolfBase.sequences and type(right) not in SeawolfBase.sequences:
+                continue
+            expected = self.outcome(SeawolfVector.loop, name, left, right)
+            found = self.outcome(SeawolfVector.vectorized, name, left, right)
+            if found is not None:
+                vectorized += 1
+                self.assertEqual(found, expected, (name, left, right))
+            self.assertEqual(self.outcome(SeawolfVector.apply, name, left, right), expected)
+        self.assertGreater(vectorized, 500)
+
+class TraceTestCase(unittest.TestCase):
+
+    source = "{ i = 0; while i < 3 { print i; i = i + 1; } }"
+
+    def trace(self, interpreter):
+        """
+        Runs source on interpreter. Returns the evaluations of blocks it
+        traced.
+        """
+        trace = io.StringIO()
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(trace):
+            interpreter.run(self.source)
+        return trace.getvalue().count("[eval] Block evaluation")
+
+    def test_trace_option(self):
+        self.assertEqual(self.trace(SeawolfBase.configure(["--trace=eval", "--trace-level=info"])), 4)
+        self.assertEqual(self.trace(SeawolfBase.configure([])), 0)
+        self.assertIs(SeawolfBase.Block.evaluate, SeawolfBase.Block.plainEvaluate)
+
+    def test_statements_constructed(self):
+        trace = io.StringIO()
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(trace):
+            SeawolfBase.configure(["--trace=parse", "--trace-level=info"]).run(self.source)
+        self.assertEqual([line.partition(":")[0] for line in trace.getvalue().splitlines()], [
+            "[parse] Block construction", "[parse] Assign construction",
+            "[parse] Block construction", "[parse] Print construction",
+            "[parse] Print line", "[parse] Assign construction", "[parse] While construction"])
+
+    def test_trace_with_hooks(self):
+        import SeawolfHooks
+        hooks = SeawolfHooks.Hooks()
+        statements = []
+        hooks.add("statement", statements.append)
+        interpreter = SeawolfBase.Interpreter(hooks=hooks, trace=(["eval"], SeawolfBase.INFO))
+        self.assertEqual(self.trace(interpreter), 4)
+        self.assertEqual(len(statements), 8)
+
+    def test_trace_enabled_before_run(self):
+        import SeawolfHooks
+        hooks = SeawolfHooks.Hooks()
+        hooks.add("statement", lambda node: None)
+        trace = io.StringIO()
+        SeawolfBase.SeawolfTrace.enable(["eval"], SeawolfBase.INFO, trace)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                SeawolfBase.Interpreter(hooks=hooks).run(self.source)
+                SeawolfBase.Interpreter().run(self.source)
+        finally:
+            SeawolfBase.SeawolfTrace.disable()
+        self.assertEqual(trace.getvalue().count("[eval] Block evaluation"), 8)
+
+if __name__ == "__main__":
+    unittest.main()
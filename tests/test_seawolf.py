@@ -0,0 +1,332 @@
+"""
+Runs Seawolf.py programs in each mode of the interpreter and checks that
+they print what the plain tree walker does.
+
+Run "python -m unittest discover tests" from the top of the package.
+"""
+import contextlib
+import io
+import unittest
+
+import Seawolf
+import SeawolfOpt
+from modes import ModesTestCase
+
+class SeawolfTestCase(ModesTestCase):
+
+    language = Seawolf
+    modes = (["--vm"], ["--tiered=1"], ["--memo"], ["--optimize"], ["--vm", "--optimize"],
+             ["--tiered=1", "--optimize"], ["--memo", "--tiered=1"])
+    optimizer = staticmethod(SeawolfOpt.optimizer)
+
+class TailCallTestCase(SeawolfTestCase):
+
+    def test_deep_self_call(self):
+        self.assertModesAgree("""
+            count(n, a){ if (n < 1) { return a; } return count(n - 1, a + 1); }
+            print(count(100000, 0));
+        """, "100000\n")
+
+    def test_deep_mutual_calls(self):
+        self.assertModesAgree("""
+            even(n){ if (n == 0) { return 1; } return odd(n - 1); }
+            odd(n){ if (n == 0) { return 0; } return even(n - 1); }
+            print(even(50001));
+            print(odd(50001));
+        """, "0\n1\n")
+
+    def test_tail_call_returning_none(self):
+        self.assertModesAgree("""
+            h(){ x = 1; }
+            f(n){ if (n < 1) { return h(); } return f(n - 1); }
+            print(f(3));
+            print(h());
+        """, "None\nNone\n")
+
+    def test_falling_off_after_tail_call(self):
+        self.assertModesAgree("""
+            h(n){ if (n < 1) { return 5; } }
+            f(n){ return h(n); }
+            print(f(1));
+            print(f(0));
+        """, "None\n5\n")
+
+    def test_frame_of_another_shape(self):
+        self.assertModesAgree("""
+            a(n, x){ if (n < 1) { return x; } return b(n - 1); }
+            b(n){ y = n * 2; z = y + 1; return a(n, z); }
+            print(a(5, 0));
+        """, "1\n")
+
+    def test_reused_frame_starts_unbound(self):
+        # Each call of f starts without the y the one before it assigned,
+        # so y is the global by the time n gets to 0.
+        self.assertModesAgree("""
+            f(n){ if (n < 1) { return y; } y = n; return f(n - 1); }
+            y = 9;
+            print(f(3));
+        """, "9\n")
+
+    def test_call_that_is_not_a_tail_call(self):
+        self.assertModesAgree("""
+            f(n){ if (n < 1) { return 0; } return 1 + f(n - 1); }
+            print(f(50));
+        """, "50\n")
+
+class ArityTestCase(SeawolfTestCase):
+
+    def test_function_defined_twice(self):
+        # Neither call can be linked, so each is checked when it is made.
+        for call in ("f(1)", "f(1, 2, 3)", "g(1)"):
+            with self.subTest(call=call):
+                self.assertModesAgree("""
+                    f(a){ return a; }
+                    f(a, b){ return a; }
+                    g(n){ return f(n); }
+                    print(f(1, 2));
+                    print(%s);
+                """ % call, "1\nSEMANTIC ERROR\n")
+
+    def test_tail_call_in_a_loop(self):
+        self.assertModesAgree("""
+            f(a){ return a; }
+            f(a, b){ if (a < 1) { return b; } return f(a - 1); }
+            print(f(3, 0));
+        """, "SEMANTIC ERROR\n")
+
+class BudgetTestCase(SeawolfTestCase):
+
+    programs = (
+        "f(n){ if (n < 1) { return 0; } return 1 + f(n - 1); } print(f(50));",
+        "count(n, a){ if (n < 1) { return a; } return count(n - 1, a + 1); } print(count(300, 0));",
+        """
+            even(n){ if (n == 0) { return 1; } return odd(n - 1); }
+            odd(n){ if (n == 0) { return 0; } return even(n - 1); }
+            print(even(301));
+        """,
+        # g defines a function, so it is never compiled and compiled
+        # callers call it through the interpreter.
+        """
+            g(x){ if (x < 0) { h(){ return 1; } } return x + 1; }
+            f(n){ if (n < 1) { return 0; } return g(n) + f(n - 1); }
+            print(f(40));
+        """,
+        """
+            g(x){ if (x < 0) { h(){ return 1; } } return x; }
+            f(n){ if (n < 1) { return 0; } x = f(n - 1); return g(n); }
+            print(f(40));
+        """)
+
+    def steps(self, interpreter, source):
+        with contextlib.redirect_stdout(io.StringIO()):
+            interpreter.run(source)
+        budget = interpreter.budget
+        return budget.taken + budget.chunk - budget.countdown
+
+    def test_one_step_per_call_in_every_mode(self):
+        import SeawolfHooks
+        hooks = SeawolfHooks.Hooks()
+        hooks.add("call", lambda name, args: None)
+        for source in self.programs:
+            plain = self.steps(Seawolf.configure(["--steps=100000"]), source)
+            for options in (["--vm"], ["--tiered=1"], ["--tiered=5"]):
+                with self.subTest(source=source, options=options):
+                    self.assertEqual(self.steps(Seawolf.configure(options + ["--steps=100000"]),
+                                                source), plain)
+            interpreter = Seawolf.configure(["--steps=100000"])
+            interpreter.hooks = hooks
+            self.assertEqual(self.steps(interpreter, source), plain)
+
+    def test_steps_stop_at_the_same_call(self):
+        source = """
+            g(x){ if (x < 0) { h(){ return 1; } } print(x); return x; }
+            f(n){ if (n < 1) { return 0; } x = g(n); return f(n - 1); }
+            print(f(100));
+        """
+        plain = self.output(["--steps=30"], source)
+        self.assertTrue(plain[0].endswith("BUDGET EXCEEDED\n"))
+        for options in (["--vm"], ["--tiered=1"], ["--tiered=5"]):
+            with self.subTest(options=options):
+                self.assertEqual(self.output(options + ["--steps=30"], source), plain)
+
+class MemoTestCase(unittest.TestCase):
+
+    def counters(self, options, source):
+        """
+        Runs source with options. Returns the hits, misses, evictions and
+        cached results SeawolfMemo reports, by function.
+        """
+        errors = io.StringIO()
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(errors):
+            Seawolf.configure(options).run(source)
+        rows = [line.split() for line in errors.getvalue().splitlines()[1:]]
+        return dict((row[0], tuple(int(n) for n in row[1:])) for row in rows)
+
+    def test_pure_and_impure_calls(self):
+        self.assertEqual(self.counters(["--memo"], """
+            sq(x){ return x * x; }
+            p(x){ print(x); return x; }
+            print(sq(3) + sq(3) + sq(3) + sq(3) + sq(3));
+            print(p(1) + p(1));
+        """), {"sq": (4, 1, 0, 1)})
+
+    def test_evictions(self):
+        self.assertEqual(self.counters(["--memo=2"], """
+            sq(x){ return x * x; }
+            print(sq(1) + sq(2) + sq(3) + sq(1) + sq(1));
+        """), {"sq": (1, 4, 2, 2)})
+
+class ProfileTestCase(unittest.TestCase):
+
+    source = "f(n){ if (n < 1) { return 0; } return 1 + f(n - 1); } print(f(30));"
+
+    def profile(self, interpreter):
+        """
+        Runs source twice on interpreter, as the daemon does. Returns what
+        went to stderr the second time.
+        """
+        for i in range(2):
+            errors = io.StringIO()
+            with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(errors):
+                interpreter.reset()
+                interpreter.run(self.source)
+        return errors.getvalue()
+
+    def test_report_of_each_run(self):
+        report = self.profile(Seawolf.configure(["--profile"]))
+        self.assertRegex(report, r"\nf +31 ")
+
+    def test_vm_warns(self):
+        report = self.profile(Seawolf.configure(["--profile", "--vm"]))
+        self.assertEqual(report, "--profile is ignored: only the tree walker can be profiled\n")
+
+class SampleTestCase(unittest.TestCase):
+
+    def test_off_the_main_thread(self):
+        # As in SeawolfServer, whose programs run on a thread of their own.
+        import concurrent.futures
+        source = "f(n){ if (n < 1) { return 0; } return 1 + f(n - 1); } print(f(30));"
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+            with concurrent.futures.ThreadPoolExecutor(1) as executor:
+                executor.submit(Seawolf.configure(["--sample"]).run, source).result()
+        self.assertEqual(output.getvalue(),
+                         "--sample is ignored: only the main thread can be sampled\n30\n")
+
+class OptimizerTestCase(SeawolfTestCase):
+
+    def test_folding(self):
+        source = """
+            n = 5;
+            print(n + 1 - 1); print(2 * 3 + 4); print(1 + n + 2 + 3);
+        """
+        self.assertIn(("fold", "constant chains"), self.changes(source))
+        self.assertModesAgree(source, "5\n10\n11\n")
+
+    def test_modulo_by_zero_left_to_fail(self):
+        self.assertModesAgree("""
+            x = 0;
+            if (x == 1) { print(7 % 0); }
+            print(1);
+            print(7 % 0);
+        """)
+
+    def test_dead_code(self):
+        source = """
+            f(n){ return n; print(9); }
+            print(f(1));
+            if (1 == 1) { print(2); } else { print(3); }
+            if (0) { print(4); }
+        """
+        self.assertIn(("dce", "statements"), self.changes(source))
+        self.assertIn(("dce", "branches"), self.changes(source))
+        self.assertModesAgree(source, "1\n2\n")
+
+    def test_identities_kept_on_none(self):
+        # Variables and calls can hold None, whose TypeError must stay.
+        self.assertModesAgree("""
+            h(){ x = 1; }
+            y = h();
+            print(5);
+            print(y + 0);
+        """)
+        self.assertModesAgree("print(1); print(h() * 1); h(){ x = 1; }")
+
+class InlinerTestCase(SeawolfTestCase):
+
+    def assertInlined(self, source, calls, expected):
+        self.assertEqual(self.changes(source).get(("inline", "calls"), 0), calls)
+        self.assertModesAgree(source, expected)
+
+    def test_inlined(self):
+        self.assertInlined("""
+            sq(x){ return x * x; }
+            add(a, b){ return a + b; }
+            print(sq(7)); print(add(sq(2), 3));
+            y = 4; print(add(y, y));
+        """, 4, "49\n7\n8\n")
+
+    def test_parameters_do_not_capture(self):
+        self.assertInlined("""
+            f(a){ return a * 2; }
+            g(x, a){ return f(x) + a; }
+            print(g(3, 100));
+        """, 2, "106\n")
+
+    def test_modulo_by_zero_in_a_branch_not_taken(self):
+        self.assertInlined("""
+            f(a){ return a % 0; }
+            x = 0;
+            if (x == 1) { print(f(2)); }
+            print(2);
+        """, 1, "2\n")
+
+    def test_call_in_argument_used_twice(self):
+        self.assertInlined("""
+            sq(x){ return x * x; }
+            n(){ print(5); return 2; }
+            print(sq(n()));
+        """, 0, "5\n4\n")
+
+    def test_call_in_unused_argument(self):
+        self.assertInlined("""
+            k(a, b){ return a; }
+            n(){ print(5); return 2; }
+            print(k(1, n()));
+        """, 0, "5\n1\n")
+
+    def test_none_argument(self):
+        self.assertInlined("""
+            h(){ x = 1; }
+            k(x){ return x; }
+            print(k(h()));
+        """, 0, "None\n")
+        self.assertModesAgree("""
+            h(){ x = 1; }
+            k(x){ return x + 0; }
+            print(k(h()));
+        """)
+
+    def test_function_reading_a_global(self):
+        self.assertInlined("""
+            g(x){ return x + y; }
+            y = 10; print(g(1));
+            y = 20; print(g(1));
+        """, 0, "11\n21\n")
+
+    def test_function_defined_twice(self):
+        self.assertInlined("""
+            f(x){ return x; }
+            print(f(1));
+            f(x){ return x + 1; }
+            print(f(1));
+        """, 0, "1\n2\n")
+
+    def test_function_defined_after_the_call(self):
+        self.assertInlined("print(f(2)); f(a){ return a * 2; }", 0, None)
+
+    def test_call_as_a_statement(self):
+        self.assertInlined("f(a){ return a * 2; } f(3); print(1);", 0, "1\n")
+
+if __name__ == "__main__":
+    unittest.main()
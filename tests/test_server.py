@@ -0,0 +1,75 @@
+"""
+Runs programs on a SeawolfServer daemon started on a socket of its own.
+
+Run "python -m unittest discover tests" from the top of the package.
+"""
+import asyncio
+import io
+import os
+import socket
+import tempfile
+import threading
+import time
+import unittest
+
+import SeawolfServer
+
+class ServerTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.directory.name, "seawolf.sock")
+        cls.loop = asyncio.new_event_loop()
+        cls.task = cls.loop.create_task(SeawolfServer.Server(cls.path).serve())
+        cls.task.add_done_callback(lambda task: cls.loop.stop())
+        cls.thread = threading.Thread(target=cls.loop.run_forever)
+        cls.thread.start()
+        while not os.path.exists(cls.path):
+            time.sleep(0.01)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.loop.call_soon_threadsafe(cls.task.cancel)
+        cls.thread.join()
+        cls.loop.close()
+        cls.directory.cleanup()
+
+    def send(self, source, options=()):
+        """
+        Returns what the daemon sends back for source. A daemon that never
+        closes the connection fails the test instead of hanging it.
+        """
+        output = io.BytesIO()
+        timeout = socket.getdefaulttimeout()
+        socket.setdefaulttimeout(10)
+        try:
+            SeawolfServer.send(source, options, self.path, output)
+        finally:
+            socket.setdefaulttimeout(timeout)
+        return output.getvalue().decode()
+
+    source = "f(n){ if (n < 1) { return 0; } return 1 + f(n - 1); } print(f(30));"
+
+    def test_programs(self):
+        self.assertEqual(self.send(self.source), "30\n")
+        self.assertEqual(self.send("{ print 1 + 2; }", ["--base"]), "Console print:  3\n")
+        self.assertEqual(self.send(self.source, ["--vm"]), "30\n")
+
+    def test_bad_option(self):
+        output = self.send(self.source, ["--tiered=x"])
+        self.assertTrue(output.startswith("Traceback"))
+        self.assertIn("ValueError", output)
+        self.assertEqual(self.send(self.source), "30\n")
+
+    def test_files_not_written(self):
+        for option in ("--profile", "--sample"):
+            with self.subTest(option=option):
+                name = os.path.join(self.directory.name, option[2:] + ".txt")
+                output = self.send(self.source, [option + "=" + name])
+                self.assertTrue(output.startswith("%s=%s is ignored" % (option, name)))
+                self.assertIn("30\n", output)
+                self.assertFalse(os.path.exists(name))
+
+if __name__ == "__main__":
+    unittest.main()